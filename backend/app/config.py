@@ -13,6 +13,10 @@ class Settings:
     # Development database URL (if using local PostgreSQL)
     DEV_DATABASE_URL: str = os.getenv("DEV_DATABASE_URL", "postgresql://localhost/youth_attendance_dev")
     
+    # Connection pool sizing - sync endpoints run in FastAPI's threadpool, so allow enough connections for it
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    
     # Application Configuration
     DEBUG: bool = os.getenv("DEBUG", "true").lower() == "true"
     
@@ -29,6 +33,8 @@ class Settings:
     TWILIO_PHONE_NUMBER: Optional[str] = os.getenv("TWILIO_PHONE_NUMBER")
     SMS_MAX_MESSAGES_PER_HOUR: int = int(os.getenv("SMS_MAX_MESSAGES_PER_HOUR", "150"))
     SMS_COST_PER_MESSAGE: float = float(os.getenv("SMS_COST_PER_MESSAGE", "0.0083"))
+    SMS_MAX_MPS: int = int(os.getenv("SMS_MAX_MPS", "10"))  # Concurrent Twilio sends allowed during a group SMS
+    REDIS_URL: Optional[str] = os.getenv("REDIS_URL")  # Shares the SMS rate limit across workers when set
     
     @property
     def database_url(self) -> Optional[str]:
@@ -2,7 +2,7 @@ from sqlalchemy import create_engine, MetaData, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
 import pytz
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 
 # SQLAlchemy setup
 engine = None
@@ -125,6 +125,25 @@ def evolve_schema(engine):
                 else:
                     print("✅ Messages table schema is already up to date")
             
+            # Indexes backing the message history and analytics queries (create_all only adds them to new tables)
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_messages_channel_group_created
+                ON messages (channel, group_id, created_at)
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_messages_channel_created_status
+                ON messages (channel, created_at, status)
+            """))
+            # Superseded by ix_messages_channel_created_status, which covers the same prefix
+            conn.execute(text("DROP INDEX IF EXISTS ix_messages_channel_created"))
+            # Twilio status webhooks look messages up by SID; tables created before
+            # twilio_sid was declared index=True won't have it yet
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_messages_twilio_sid
+                ON messages (twilio_sid)
+            """))
+            print("✅ Message history indexes are in place")
+            
             # Evolution for events table - add new datetime fields
             print("🔄 Checking events table schema...")
             
@@ -206,13 +225,44 @@ def evolve_schema(engine):
         print(f"⚠️ Schema evolution error (this may be normal for new installations): {e}")
 
 
+def create_message_partition(conn, month: date):
+    """Create the messages partition holding the calendar month starting at `month`."""
+    next_month = (month + timedelta(days=32)).replace(day=1)
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS messages_{month:%Y_%m}
+        PARTITION OF messages FOR VALUES FROM ('{month}') TO ('{next_month}')
+    """))
+
+
+def ensure_message_partitions(engine, months_ahead: int = 2):
+    """
+    Keep monthly messages partitions created ahead of time.
+    No-op unless messages has been converted to a partitioned table
+    (see migrations/partition_messages_by_month.py).
+    """
+    with engine.begin() as conn:
+        relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('messages')")).scalar()
+        if relkind != "p":
+            return
+        
+        month = datetime.now(timezone.utc).date().replace(day=1)
+        for _ in range(months_ahead + 1):
+            create_message_partition(conn, month)
+            month = (month + timedelta(days=32)).replace(day=1)
+
+
 def init_database():
     """Initialize database connection based on configuration"""
     global engine, SessionLocal
     
     if settings.DATABASE_TYPE == "postgresql" and settings.database_url:
-        engine = create_engine(settings.database_url)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        engine = create_engine(
+            settings.database_url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_pre_ping=True
+        )
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
         
         # Import database models to ensure they're registered with Base
         from app import db_models
@@ -223,6 +273,11 @@ def init_database():
         # Apply schema evolution changes
         evolve_schema(engine)
         
+        try:
+            ensure_message_partitions(engine)
+        except Exception as e:
+            print(f"⚠️ Could not create upcoming messages partitions: {e}")
+        
         print(f"✅ Connected to PostgreSQL: {settings.database_url}")
     else:
         print("✅ Using in-memory storage (development mode)")
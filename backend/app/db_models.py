@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Text, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Text, Boolean, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -161,8 +161,33 @@ class MessageDB(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
+    __table_args__ = (
+        # Message history filters by channel (and group) and orders by newest first;
+        # status rides along so analytics can count per status from the index alone
+        Index('ix_messages_channel_group_created', 'channel', 'group_id', 'created_at'),
+        Index('ix_messages_channel_created_status', 'channel', 'created_at', 'status'),
+    )
+    
     # Relationships
     group = relationship("MessageGroupDB", back_populates="messages")
+    recipient_person = relationship("PersonDB")
+
+
+class SMSDailyRollupDB(Base):
+    """
+    Per-day SMS message counts, rolled up nightly from the messages table.
+    Analytics reads these for closed days and only aggregates raw messages
+    that arrived after the last rolled-up day.
+    """
+    __tablename__ = "sms_daily_rollups"
+    
+    day = Column(Date, primary_key=True)
+    total_count = Column(Integer, default=0, nullable=False)
+    delivered_count = Column(Integer, default=0, nullable=False)
+    failed_count = Column(Integer, default=0, nullable=False)
+    person_count = Column(Integer, default=0, nullable=False)  # Messages linked to a person record
+    
+    rolled_up_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 
 class MessageTemplateDB(Base):
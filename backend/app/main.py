@@ -1,4 +1,5 @@
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import sys
 
@@ -20,7 +21,9 @@ from app.routers.attendance import router as attendance_router
 from app.routers.user import router as user_router
 from app.routers.groups import router as groups_router
 from app.routers.sms import router as sms_router
+from app import database
 from app.database import init_database
+from app.services import sms_analytics
 from app.repositories import init_repositories
 from app.config import settings
 
@@ -50,11 +53,18 @@ async def lifespan(app: FastAPI):
     init_database()
     init_repositories()
     
+    # Keep SMS analytics rollups current so analytics requests skip closed days
+    rollup_task = None
+    if database.SessionLocal:
+        rollup_task = asyncio.create_task(sms_analytics.run_nightly_rollups(database.SessionLocal))
+    
     logger.info("✅ Application startup complete")
     
     yield
     
-    # Shutdown (if needed)
+    # Shutdown
+    if rollup_task:
+        rollup_task.cancel()
     logger.info("🛑 Application shutdown")
 
 app = FastAPI(
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Union
+from typing import Iterable, List, Optional, Union
 from app.models import Youth, Leader, Parent, Event, EventCreate, EventUpdate, User, PersonCreate, PersonUpdate, ParentYouthRelationshipCreate
 from app.messaging_models import MessageGroup, MessageGroupCreate, MessageGroupUpdate, MessageGroupMembership, MessageGroupMembershipCreate, MessageGroupMembershipWithPerson, BulkGroupMembershipResponse
 from datetime import datetime
@@ -74,6 +74,11 @@ class PersonRepository(ABC):
     async def get_person(self, person_id: int) -> Optional[Union[Youth, Leader, Parent]]:
         pass
     
+    @abstractmethod
+    async def get_persons_by_ids(self, person_ids: Iterable[int]) -> List[Union[Youth, Leader, Parent]]:
+        """Get the non-archived persons among the given IDs in a single lookup"""
+        pass
+    
     @abstractmethod
     async def update_person(self, person_id: int, person: Union[Youth, Leader, Parent]) -> Union[Youth, Leader, Parent]:
         pass
@@ -117,6 +122,11 @@ class EventRepository(ABC):
     async def has_event_persons(self, event_id: int) -> bool:
         """Check if event has any event_persons attached"""
         pass
+    
+    @abstractmethod
+    async def check_in_people(self, event_id: int, people: List[Union[Youth, Leader]]) -> datetime:
+        """Check people in to an event at one time, all or none; ValueError if any is already checked in"""
+        pass
 
 class UserRepository(ABC):
     """Abstract interface for user storage"""
@@ -1,6 +1,6 @@
-from typing import List, Optional, Union
+from typing import Iterable, List, Optional, Union
 from app.repositories.base import PersonRepository, EventRepository, UserRepository, MessageGroupRepository
-from app.models import Youth, Leader, Parent, Event, EventCreate, EventUpdate, User, PersonCreate, PersonUpdate, ParentYouthRelationshipCreate
+from app.models import Youth, Leader, Parent, Event, EventCreate, EventUpdate, EventPerson, User, PersonCreate, PersonUpdate, ParentYouthRelationshipCreate
 from app.messaging_models import MessageGroup, MessageGroupCreate, MessageGroupUpdate, MessageGroupMembership, MessageGroupMembershipCreate, MessageGroupMembershipWithPerson, BulkGroupMembershipResponse, YouthWithType, LeaderWithType, ParentWithType
 import datetime
 
@@ -31,6 +31,10 @@ class InMemoryPersonRepository(PersonRepository):
             return person
         return None
     
+    async def get_persons_by_ids(self, person_ids: Iterable[int]) -> List[Union[Youth, Leader, Parent]]:
+        persons = (self.store.get(person_id) for person_id in set(person_ids))
+        return [person for person in persons if person and person.archived_on is None]
+    
     async def update_person(self, person_id: int, person: Union[Youth, Leader, Parent]) -> Union[Youth, Leader, Parent]:
         if person.archived_on is not None:
             raise ValueError("Cannot update person with archived_on field")
@@ -403,6 +407,27 @@ class InMemoryEventRepository(EventRepository):
         
         # Check if there are any youth or leaders with check-in records
         return len(event.youth) > 0 or len(event.leaders) > 0
+    
+    async def check_in_people(self, event_id: int, people: List[Union[Youth, Leader]]) -> datetime.datetime:
+        event = self.store.get(event_id)
+        if not event:
+            raise ValueError(f"Event with ID {event_id} not found")
+        
+        checked_in_ids = {attendee.person_id for attendee in event.youth + event.leaders}
+        if any(person.id in checked_in_ids for person in people):
+            raise ValueError("Person is already checked in to this event")
+        
+        check_in_time = datetime.datetime.now(datetime.timezone.utc)
+        for person in people:
+            event_person = EventPerson(person_id=person.id, check_in=check_in_time)
+            
+            # Add to appropriate list based on person type
+            if hasattr(person, 'grade'):  # Youth
+                event.youth.append(event_person)
+            else:  # Leader
+                event.leaders.append(event_person)
+        
+        return check_in_time
 
 class InMemoryUserRepository(UserRepository):
     """In-memory implementation for user management"""
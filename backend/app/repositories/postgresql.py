@@ -1,5 +1,5 @@
-from typing import List, Optional, Union
-from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional, Union
+from sqlalchemy.orm import Session, selectinload, joinedload
 from app.repositories.base import PersonRepository, EventRepository, UserRepository, MessageGroupRepository
 from app.models import Youth, Leader, Parent, Event, EventCreate, EventUpdate, EventPerson, User, PersonCreate, PersonUpdate, ParentYouthRelationshipCreate
 from app.messaging_models import MessageGroup, MessageGroupCreate, MessageGroupUpdate, MessageGroupMembership, MessageGroupMembershipWithPerson, BulkGroupMembershipResponse, YouthWithType, LeaderWithType, ParentWithType
@@ -113,6 +113,17 @@ class PostgreSQLPersonRepository(PersonRepository):
             return self._db_to_pydantic(db_person)
         return None
     
+    async def get_persons_by_ids(self, person_ids: Iterable[int]) -> List[Union[Youth, Leader, Parent]]:
+        person_ids = set(person_ids)
+        if not person_ids:
+            return []
+        
+        db_persons = self.db.query(PersonDB).filter(
+            PersonDB.id.in_(person_ids),
+            PersonDB.archived_on.is_(None)
+        ).all()
+        return [self._db_to_pydantic(db_person) for db_person in db_persons]
+    
     async def update_person(self, person_id: int, person: Union[Youth, Leader, Parent]) -> Union[Youth, Leader, Parent]:
         if person.archived_on is not None:
             raise ValueError("Cannot update person with archived_on field")
@@ -310,8 +321,8 @@ class PostgreSQLPersonRepository(PersonRepository):
         existing = self.db.query(ParentYouthRelationshipDB).filter(
             ParentYouthRelationshipDB.parent_id == relationship.parent_id,
             ParentYouthRelationshipDB.youth_id == relationship.youth_id
-        ).first()
-        if existing:
+        )
+        if self.db.query(existing.exists()).scalar():
             raise ValueError("Parent is already linked to this youth")
         
         # Create relationship
@@ -405,8 +416,10 @@ class PostgreSQLPersonRepository(PersonRepository):
     
     async def get_parents_for_youth(self, youth_id: int) -> List[dict]:
         """Get all parents linked to a youth with relationship details"""
-        # Verify youth exists
-        youth = self.db.query(PersonDB).filter(
+        # Verify youth exists, batch-loading relationships and parents alongside it
+        youth = self.db.query(PersonDB).options(
+            selectinload(PersonDB.parent_relationships).joinedload(ParentYouthRelationshipDB.parent)
+        ).filter(
             PersonDB.id == youth_id,
             PersonDB.person_type == "youth",
             PersonDB.archived_on.is_(None)
@@ -414,16 +427,11 @@ class PostgreSQLPersonRepository(PersonRepository):
         if not youth:
             raise ValueError("Youth not found")
         
-        # Get relationships with parent details
-        relationships = self.db.query(ParentYouthRelationshipDB, PersonDB).join(
-            PersonDB, PersonDB.id == ParentYouthRelationshipDB.parent_id
-        ).filter(
-            ParentYouthRelationshipDB.youth_id == youth_id,
-            PersonDB.archived_on.is_(None)
-        ).all()
-        
         results = []
-        for relationship, parent in relationships:
+        for relationship in youth.parent_relationships:
+            parent = relationship.parent
+            if parent.archived_on is not None:
+                continue
             results.append({
                 "id": relationship.id,
                 "parent_id": relationship.parent_id,
@@ -438,8 +446,10 @@ class PostgreSQLPersonRepository(PersonRepository):
     
     async def get_youth_for_parent(self, parent_id: int) -> List[dict]:
         """Get all youth linked to a parent with relationship details"""
-        # Verify parent exists
-        parent = self.db.query(PersonDB).filter(
+        # Verify parent exists, batch-loading relationships and youth alongside it
+        parent = self.db.query(PersonDB).options(
+            selectinload(PersonDB.youth_relationships).joinedload(ParentYouthRelationshipDB.youth)
+        ).filter(
             PersonDB.id == parent_id,
             PersonDB.person_type == "parent",
             PersonDB.archived_on.is_(None)
@@ -447,16 +457,11 @@ class PostgreSQLPersonRepository(PersonRepository):
         if not parent:
             raise ValueError("Parent not found")
         
-        # Get relationships with youth details
-        relationships = self.db.query(ParentYouthRelationshipDB, PersonDB).join(
-            PersonDB, PersonDB.id == ParentYouthRelationshipDB.youth_id
-        ).filter(
-            ParentYouthRelationshipDB.parent_id == parent_id,
-            PersonDB.archived_on.is_(None)
-        ).all()
-        
         results = []
-        for relationship, youth in relationships:
+        for relationship in parent.youth_relationships:
+            youth = relationship.youth
+            if youth.archived_on is not None:
+                continue
             results.append({
                 "id": relationship.id,
                 "parent_id": relationship.parent_id,
@@ -715,6 +720,32 @@ class PostgreSQLEventRepository(EventRepository):
         
         count = self.db.query(EventPersonDB).filter(EventPersonDB.event_id == event_id).count()
         return count > 0
+    
+    async def check_in_people(self, event_id: int, people: List[Union[Youth, Leader]]) -> datetime:
+        from app.db_models import EventPersonDB
+        
+        person_ids = [person.id for person in people]
+        existing = self.db.query(EventPersonDB.person_id).filter(
+            EventPersonDB.event_id == event_id,
+            EventPersonDB.person_id.in_(person_ids)
+        ).first()
+        if existing:
+            raise ValueError("Person is already checked in to this event")
+        
+        # Create all check-in records in a single commit
+        check_in_time = datetime.now(timezone.utc)
+        self.db.add_all([
+            EventPersonDB(
+                event_id=event_id,
+                person_id=person.id,
+                check_in=check_in_time,
+                person_type="youth" if hasattr(person, 'grade') else "leader"
+            )
+            for person in people
+        ])
+        self.db.commit()
+        
+        return check_in_time
 
 class PostgreSQLUserRepository(UserRepository):
     """PostgreSQL implementation for user management"""
@@ -785,8 +816,8 @@ class PostgreSQLUserRepository(UserRepository):
     
     async def create_user(self, user: User) -> User:
         # Check for duplicate username
-        existing = self.db.query(UserDB).filter(UserDB.username == user.username).first()
-        if existing:
+        existing = self.db.query(UserDB).filter(UserDB.username == user.username)
+        if self.db.query(existing.exists()).scalar():
             raise ValueError(f"Username '{user.username}' already exists")
         
         db_user = self._pydantic_to_db(user)
@@ -821,8 +852,8 @@ class PostgreSQLUserRepository(UserRepository):
         existing = self.db.query(UserDB).filter(
             UserDB.username == user.username,
             UserDB.id != user_id
-        ).first()
-        if existing:
+        )
+        if self.db.query(existing.exists()).scalar():
             raise ValueError(f"Username '{user.username}' already exists")
         
         # Update fields
@@ -993,7 +1024,7 @@ class PostgreSQLMessageGroupRepository(MessageGroupRepository):
         if exclude_id is not None:
             query = query.filter(MessageGroupDB.id != exclude_id)
         
-        return query.first() is not None
+        return self.db.query(query.exists()).scalar()
     
     async def add_member(self, group_id: int, person_id: int, added_by: Optional[Union[int, str]]) -> Optional[MessageGroupMembership]:
         """Add a person to a message group"""
@@ -1080,12 +1111,12 @@ class PostgreSQLMessageGroupRepository(MessageGroupRepository):
     
     async def is_member(self, group_id: int, person_id: int) -> bool:
         """Check if a person is a member of a group"""
-        db_membership = self.db.query(MessageGroupMembershipDB).filter(
+        membership = self.db.query(MessageGroupMembershipDB).filter(
             MessageGroupMembershipDB.group_id == group_id,
             MessageGroupMembershipDB.person_id == person_id
-        ).first()
+        )
         
-        return db_membership is not None
+        return self.db.query(membership.exists()).scalar()
     
     async def add_multiple_members(self, group_id: int, person_ids: List[int], added_by: Optional[Union[int, str]]) -> BulkGroupMembershipResponse:
         """Add multiple people to a message group"""
@@ -4,6 +4,7 @@ from typing import Optional
 from app.clerk_auth import get_current_clerk_user
 from sqlalchemy.orm import Session
 import datetime
+import logging
 from datetime import timezone
 
 # Lazy loading functions
@@ -22,12 +23,17 @@ def get_repositories(db_session):
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 class CheckInRequest(BaseModel):
     person_id: int
 
 class CheckOutRequest(BaseModel):
     person_id: int
 
+class BulkCheckInRequest(BaseModel):
+    person_ids: list[int]
+
 @router.post("/event/{event_id}/checkin")
 async def check_in_person(
     event_id: int,
@@ -49,59 +55,12 @@ async def check_in_person(
         if not person:
             raise HTTPException(status_code=404, detail="Person not found")
         
-        from app.config import settings
+        try:
+            check_in_time = await repos["event"].check_in_people(event_id, [person])
+        except ValueError:
+            raise HTTPException(status_code=409, detail="Person is already checked in to this event")
         
-        if settings.DATABASE_TYPE == "memory":
-            # Handle in-memory repository
-            # Check if already checked in
-            all_attendees = event.youth + event.leaders
-            for attendee in all_attendees:
-                if attendee.person_id == request.person_id:
-                    raise HTTPException(status_code=409, detail="Person is already checked in to this event")
-            
-            # Create event_person record
-            from app.models import EventPerson
-            event_person = EventPerson(
-                person_id=request.person_id,
-                check_in=datetime.datetime.now(timezone.utc)
-            )
-            
-            # Add to appropriate list based on person type
-            if hasattr(person, 'grade'):  # Youth
-                event.youth.append(event_person)
-            else:  # Leader
-                event.leaders.append(event_person)
-            
-            # Update the event in the repository
-            await repos["event"].update_event(event_id, event)
-            
-            return {"message": "Person checked in successfully", "check_in": event_person.check_in}
-            
-        else:
-            # Handle PostgreSQL database directly
-            from app.db_models import EventPersonDB
-            
-            # Check if already checked in
-            existing = db.query(EventPersonDB).filter(
-                EventPersonDB.event_id == event_id,
-                EventPersonDB.person_id == request.person_id
-            ).first()
-            
-            if existing:
-                raise HTTPException(status_code=409, detail="Person is already checked in to this event")
-            
-            # Create new check-in record
-            event_person = EventPersonDB(
-                event_id=event_id,
-                person_id=request.person_id,
-                check_in=datetime.datetime.now(timezone.utc),
-                person_type="youth" if hasattr(person, 'grade') else "leader"
-            )
-            
-            db.add(event_person)
-            db.commit()
-            
-            return {"message": "Person checked in successfully", "check_in": event_person.check_in}
+        return {"message": "Person checked in successfully", "check_in": check_in_time}
         
     except HTTPException:
         raise
@@ -109,6 +68,51 @@ async def check_in_person(
         print(f"Error in check_in_person: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/event/{event_id}/checkin-bulk")
+async def check_in_people(
+    event_id: int,
+    request: BulkCheckInRequest,
+    db: Session = Depends(connect_to_db()),
+    current_user: dict = Depends(get_current_clerk_user),
+):
+    """Check in several people to an event in one request (all or none)"""
+    try:
+        repos = get_repositories(db)
+        
+        # Verify event exists
+        event = await repos["event"].get_event(event_id)
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        
+        person_ids = list(dict.fromkeys(request.person_ids))
+        
+        # Verify every person exists with a single lookup
+        found = {person.id: person for person in await repos["person"].get_persons_by_ids(person_ids)}
+        missing_ids = [person_id for person_id in person_ids if person_id not in found]
+        if missing_ids:
+            raise HTTPException(
+                status_code=404,
+                detail=f"People not found: {', '.join(map(str, missing_ids))}"
+            )
+        people = {person_id: found[person_id] for person_id in person_ids}
+        
+        try:
+            check_in_time = await repos["event"].check_in_people(event_id, list(people.values()))
+        except ValueError:
+            raise HTTPException(status_code=409, detail="One or more people are already checked in to this event")
+        
+        return {
+            "message": f"Successfully checked in {len(people)} people",
+            "checked_in_count": len(people),
+            "check_in": check_in_time
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error in check_in_people: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.put("/event/{event_id}/checkout")
 async def check_out_person(
     event_id: int,
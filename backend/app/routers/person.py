@@ -2,35 +2,25 @@ from fastapi import APIRouter, Request, HTTPException, Depends, Query, status
 from typing import Union, List, Optional
 from app.models import Youth, Leader, Parent, Person, User, PersonCreate, PersonUpdate, ParentYouthRelationshipCreate, ParentYouthRelationshipUpdate
 from app.clerk_auth import get_current_clerk_user
+from app.database import get_db
+from app.repositories import get_person_repository
 from sqlalchemy.orm import Session
 import datetime
+import logging
 
 router = APIRouter()
 
-# Lazy loading functions
-def connect_to_db():
-    """Lazily import and return database dependency"""
-    from app.database import get_db
-    return get_db
+logger = logging.getLogger(__name__)
 
 def get_repositories(db_session):
-    """Lazily import and return repository instances"""
-    from app.repositories import get_person_repository
+    """Return repository instances for the given session"""
     return {
         "person": get_person_repository(db_session)
     }
 
-ERRORS = {
-	"person_not_found": {
-		"status_code": 404,
-		"detail": "Person not found"
-	}
-}
-PERSON_NOT_FOUND = "person_not_found"
-
 @router.get("/person/youth", response_model=list[Youth])
 async def get_all_non_archived_youth(
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	repos = get_repositories(db)
@@ -49,7 +39,7 @@ async def get_all_non_archived_youth(
 
 @router.get("/person/leaders", response_model=list[Leader])
 async def get_all_non_archived_leaders(
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	try:
@@ -64,13 +54,13 @@ async def get_all_non_archived_leaders(
 			result.append(data)
 		return result
 	except Exception as e:
-		print(f"Error in get_all_non_archived_leaders: {e}")
+		logger.exception("Error in get_all_non_archived_leaders")
 		raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/person", response_model=Union[Youth, Leader])
 async def create_person(
 	person: Union[Youth, Leader],
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	repos = get_repositories(db)
@@ -85,14 +75,17 @@ async def create_person(
 @router.get("/person/{person_id}", response_model=Union[Youth, Leader, Parent])
 async def get_person(
 	person_id: int,
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	repos = get_repositories(db)
 	person = await repos["person"].get_person(person_id)
 	
 	if not person:
-		raise HTTPException(**ERRORS[PERSON_NOT_FOUND])
+		raise HTTPException(
+			status_code=status.HTTP_404_NOT_FOUND,
+			detail="Person not found"
+		)
 	
 	# For individual person requests, return all fields including health data
 	data = person.model_dump()
@@ -103,7 +96,7 @@ async def get_person(
 async def update_person(
 	person_id: int,
 	person: Union[Youth, Leader, Parent, PersonUpdate],
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	repos = get_repositories(db)
@@ -129,7 +122,7 @@ async def update_person(
 @router.delete("/person/{person_id}")
 async def archive_person(
 	person_id: int,
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	repos = get_repositories(db)
@@ -140,7 +133,7 @@ async def archive_person(
 @router.post("/parent", response_model=Parent)
 async def create_parent(
 	parent: PersonCreate,
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	"""Create a new parent using the unified person system."""
@@ -157,31 +150,23 @@ async def create_parent(
 
 @router.get("/parents", response_model=List[Parent])
 async def get_all_parents(
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	"""Get all non-archived parents."""
 	try:
 		repos = get_repositories(db)
-		parents_list = await repos["person"].get_all_parents()
-		
-		# Return parents without archived_on field
-		result = []
-		for parent in parents_list:
-			data = parent.copy() if isinstance(parent, dict) else parent
-			if isinstance(data, dict):
-				data.pop("archived_on", None)
-			result.append(data)
-		return result
+		# Repositories only return non-archived parents, so archived_on is already None
+		return await repos["person"].get_all_parents()
 	except Exception as e:
-		print(f"Error in get_all_parents: {e}")
+		logger.exception("Error in get_all_parents")
 		raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
 @router.get("/parent/{parent_id}", response_model=Parent)
 async def get_parent_by_id(
 	parent_id: int,
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	"""Get a specific parent by ID."""
@@ -208,31 +193,23 @@ async def get_parent_by_id(
 	except HTTPException:
 		raise
 	except Exception as e:
-		print(f"Error in get_parent_by_id: {e}")
+		logger.exception("Error in get_parent_by_id")
 		raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
 @router.get("/parents/search", response_model=List[Parent])
 async def search_parents(
 	query: str = Query(..., description="Search query for parent name, phone, or email"),
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	"""Search parents by name, phone, or email."""
 	try:
 		repos = get_repositories(db)
-		parents_list = await repos["person"].search_persons("parent", query)
-		
-		# Return parents without archived_on field
-		result = []
-		for parent in parents_list:
-			data = parent.copy() if isinstance(parent, dict) else parent
-			if isinstance(data, dict):
-				data.pop("archived_on", None)
-			result.append(data)
-		return result
+		# Repositories only return non-archived parents, so archived_on is already None
+		return await repos["person"].search_persons("parent", query)
 	except Exception as e:
-		print(f"Error in search_parents: {e}")
+		logger.exception("Error in search_parents")
 		raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Parent-Youth relationship endpoints
@@ -240,7 +217,7 @@ async def search_parents(
 async def link_parent_to_youth(
 	youth_id: int,
 	relationship: ParentYouthRelationshipCreate,
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	"""Create a parent-youth relationship."""
@@ -261,13 +238,13 @@ async def link_parent_to_youth(
 		else:
 			raise HTTPException(status_code=400, detail=str(e))
 	except Exception as e:
-		print(f"Error in link_parent_to_youth: {e}")
+		logger.exception("Error in link_parent_to_youth")
 		raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/youth/{youth_id}/parents")
 async def get_parents_for_youth(
 	youth_id: int,
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	"""Get all parents for a specific youth with relationship details."""
@@ -278,14 +255,14 @@ async def get_parents_for_youth(
 	except ValueError as e:
 		raise HTTPException(status_code=404, detail=str(e))
 	except Exception as e:
-		print(f"Error in get_parents_for_youth: {e}")
+		logger.exception("Error in get_parents_for_youth")
 		raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.delete("/youth/{youth_id}/parents/{parent_id}")
 async def unlink_parent_from_youth(
 	youth_id: int,
 	parent_id: int,
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	"""Remove a parent-youth relationship."""
@@ -299,7 +276,7 @@ async def unlink_parent_from_youth(
 	except HTTPException:
 		raise
 	except Exception as e:
-		print(f"Error in unlink_parent_from_youth: {e}")
+		logger.exception("Error in unlink_parent_from_youth")
 		raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.put("/youth/{youth_id}/parents/{parent_id}")
@@ -307,7 +284,7 @@ async def update_parent_youth_relationship(
 	youth_id: int,
 	parent_id: int,
 	update_data: ParentYouthRelationshipUpdate,
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	"""Update a parent-youth relationship."""
@@ -323,13 +300,13 @@ async def update_parent_youth_relationship(
 	except ValueError as e:
 		raise HTTPException(status_code=404, detail=str(e))
 	except Exception as e:
-		print(f"Error in update_parent_youth_relationship: {e}")
+		logger.exception("Error in update_parent_youth_relationship")
 		raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/parents/{parent_id}/youth")
 async def get_youth_for_parent(
 	parent_id: int,
-	db: Session = Depends(connect_to_db()),
+	db: Session = Depends(get_db),
 	current_user: dict = Depends(get_current_clerk_user),
 ):
 	"""Get all youth for a specific parent with relationship details."""
@@ -340,5 +317,5 @@ async def get_youth_for_parent(
 	except ValueError as e:
 		raise HTTPException(status_code=404, detail=str(e))
 	except Exception as e:
-		print(f"Error in get_youth_for_parent: {e}")
+		logger.exception("Error in get_youth_for_parent")
 		raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
@@ -1,7 +1,8 @@
 """
 User management API router with admin-only access control.
 """
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
@@ -19,8 +20,9 @@ def get_admin_user_dependency():
     from app.auth import get_current_admin_user
     return get_current_admin_user
 
+@lru_cache(maxsize=1)
 def get_auth_functions():
-    """Lazily import and return authentication functions"""
+    """Lazily import and return authentication functions (resolved once, then cached)"""
     from app.auth import get_password_hash, authenticate_user, create_access_token
     return {
         "get_password_hash": get_password_hash,
@@ -46,9 +48,9 @@ class UserCreate(BaseModel):
 
 
 class UserUpdate(BaseModel):
-    """User update model"""
+    """User update model (omit password to keep the current one)"""
     username: str
-    password: str
+    password: Optional[str] = None
     role: str
 
 
@@ -185,8 +187,11 @@ async def update_user(
             detail="User not found"
         )
     
-    # Hash the new password
-    hashed_password = auth_funcs["get_password_hash"](user_data.password)
+    # Only hash when a new password is given; hashing is deliberately slow
+    if user_data.password:
+        hashed_password = auth_funcs["get_password_hash"](user_data.password)
+    else:
+        hashed_password = existing_user.password_hash
     
     # Create updated user object
     updated_user = User(
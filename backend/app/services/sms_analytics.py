@@ -0,0 +1,172 @@
+"""
+SMS analytics rollups.
+
+Message counts for closed days are rolled up once a night into
+sms_daily_rollups, so analytics requests only aggregate the raw messages
+sent since the last rollup instead of scanning the whole messages table.
+
+Days are UTC calendar days: messages.created_at holds naive UTC timestamps,
+so day boundaries are naive UTC midnights.
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import Date, func, select
+from sqlalchemy.orm import Session
+
+from app.database import ensure_message_partitions
+from app.db_models import MessageDB, SMSDailyRollupDB
+from app.messaging_models import MessageStatus, MessageChannel
+
+logger = logging.getLogger(__name__)
+
+# Run shortly after midnight UTC so late delivery callbacks for the closing day have landed
+ROLLUP_DELAY_AFTER_MIDNIGHT = timedelta(minutes=30)
+
+# Closed days are recomputed for this long, so status callbacks that land after
+# a day was first rolled up still reach its counts
+ROLLUP_RECOMPUTE_DAYS = 7
+
+# Advisory lock key that lets one app process at a time run the rollup
+_ROLLUP_LOCK_KEY = 0x534D5352
+
+
+def _day_start(day: date) -> datetime:
+    """Naive UTC midnight at the start of `day`, comparable with messages.created_at."""
+    return datetime.combine(day, time.min)
+
+
+def _message_counts_query(db: Session, *columns):
+    """Count SMS messages in total, per final status and linked to a person."""
+    return db.query(
+        *columns,
+        func.count(),
+        func.count().filter(MessageDB.status == MessageStatus.DELIVERED.value),
+        func.count().filter(MessageDB.status == MessageStatus.FAILED.value),
+        func.count(MessageDB.recipient_person_id)
+    ).filter(MessageDB.channel == MessageChannel.SMS)
+
+
+def roll_up(db: Session, through: date) -> int:
+    """
+    Roll up every day after the last rolled-up day, up to and including `through`,
+    and recompute the last ROLLUP_RECOMPUTE_DAYS days so late status changes land.
+
+    Days without messages still get a zero row so the rollup cutoff keeps moving.
+    Returns the number of days written.
+    """
+    last_day = db.query(func.max(SMSDailyRollupDB.day)).scalar()
+    if last_day is not None:
+        start = min(last_day + timedelta(days=1), through - timedelta(days=ROLLUP_RECOMPUTE_DAYS - 1))
+    else:
+        first_sent = db.query(func.min(MessageDB.created_at)).filter(
+            MessageDB.channel == MessageChannel.SMS
+        ).scalar()
+        start = first_sent.date() if first_sent else through
+
+    if start > through:
+        return 0
+
+    message_day = func.date(MessageDB.created_at, type_=Date)
+    rows = _message_counts_query(db, message_day).filter(
+        MessageDB.created_at >= _day_start(start),
+        MessageDB.created_at < _day_start(through + timedelta(days=1))
+    ).group_by(message_day).all()
+    counts_by_day = {row[0]: row[1:] for row in rows}
+
+    day = start
+    while day <= through:
+        total, delivered, failed, with_person = counts_by_day.get(day, (0, 0, 0, 0))
+        db.merge(SMSDailyRollupDB(
+            day=day,
+            total_count=total,
+            delivered_count=delivered,
+            failed_count=failed,
+            person_count=with_person
+        ))
+        day += timedelta(days=1)
+    db.commit()
+
+    return (through - start).days + 1
+
+
+def get_message_counts(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> Dict[str, int]:
+    """
+    Count SMS messages in the date range, reading rollups for rolled-up days and
+    aggregating raw messages only for the days after them.
+    """
+    last_day = db.query(func.max(SMSDailyRollupDB.day)).scalar()
+    totals = {"total": 0, "delivered": 0, "failed": 0, "with_person": 0}
+
+    if last_day is not None:
+        rollup_query = db.query(
+            func.coalesce(func.sum(SMSDailyRollupDB.total_count), 0),
+            func.coalesce(func.sum(SMSDailyRollupDB.delivered_count), 0),
+            func.coalesce(func.sum(SMSDailyRollupDB.failed_count), 0),
+            func.coalesce(func.sum(SMSDailyRollupDB.person_count), 0)
+        )
+        if start_date:
+            rollup_query = rollup_query.filter(SMSDailyRollupDB.day >= start_date)
+        if end_date:
+            rollup_query = rollup_query.filter(SMSDailyRollupDB.day < end_date)
+        for key, value in zip(totals, rollup_query.one()):
+            totals[key] += int(value)
+
+    live_query = _message_counts_query(db)
+    if last_day is not None:
+        live_query = live_query.filter(MessageDB.created_at >= _day_start(last_day + timedelta(days=1)))
+    if start_date:
+        live_query = live_query.filter(MessageDB.created_at >= _day_start(start_date))
+    if end_date:
+        live_query = live_query.filter(MessageDB.created_at <= _day_start(end_date))
+    for key, value in zip(totals, live_query.one()):
+        totals[key] += value
+
+    return totals
+
+
+def _roll_up_closed_days(session_factory) -> Optional[int]:
+    """Roll up through yesterday, or return None if another process is already rolling up."""
+    db = session_factory()
+    try:
+        # Every app process runs the nightly task; the transaction-scoped lock is
+        # released by roll_up's commit, and the processes that miss it skip this run
+        if db.get_bind().dialect.name == "postgresql":
+            if not db.execute(select(func.pg_try_advisory_xact_lock(_ROLLUP_LOCK_KEY))).scalar():
+                return None
+        yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+        return roll_up(db, yesterday)
+    finally:
+        db.close()
+
+
+async def run_nightly_rollups(session_factory):
+    """
+    Catch up on any missed days, then roll up the previous day every night.
+    Also keeps next months' messages partitions created when the table is partitioned.
+    """
+    while True:
+        try:
+            days = await asyncio.to_thread(_roll_up_closed_days, session_factory)
+            if days is None:
+                logger.info("SMS analytics rollup skipped: another process is running it")
+            else:
+                logger.info("SMS analytics rollup wrote %d day(s)", days)
+        except Exception:
+            logger.exception("SMS analytics rollup failed")
+
+        try:
+            await asyncio.to_thread(ensure_message_partitions, session_factory.kw["bind"])
+        except Exception:
+            logger.exception("Creating upcoming messages partitions failed")
+
+        now = datetime.now(timezone.utc)
+        next_run = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+        await asyncio.sleep((next_run + ROLLUP_DELAY_AFTER_MIDNIGHT - now).total_seconds())
@@ -8,9 +8,14 @@ Follows enterprise security practices with proper error handling and monitoring.
 import os
 import re
 import logging
+import threading
+import time
+import uuid
+from array import array
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timezone, timedelta
-from collections import defaultdict, deque
+from collections import defaultdict
 
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
@@ -18,6 +23,7 @@ from twilio.request_validator import RequestValidator
 import phonenumbers
 from phonenumbers import NumberParseException
 from pydantic import BaseModel, Field, field_validator, ConfigDict
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from app.db_models import MessageDB, PersonDB
@@ -26,6 +32,40 @@ from app.messaging_models import MessageStatus
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Sliding window for max_messages_per_hour
+_RATE_LIMIT_WINDOW_US = 3_600_000_000
+
+# Shared rate limit across workers: a Redis sorted set of sends scored by the
+# Redis server clock (microseconds), so every worker sees the same window
+_RATE_LIMIT_KEY = "sms:sent"
+
+# Trims the window, counts it and records the send in one atomic step, so
+# workers sharing the key can't all pass the check before any send is counted.
+# Returns 1 if the send was recorded, or 0 if the limit is reached.
+_REDIS_RESERVE_SEND = """
+local now = redis.call('TIME')
+local now_us = now[1] * 1000000 + now[2]
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now_us - tonumber(ARGV[1]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now_us, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], math.floor(tonumber(ARGV[1]) / 1000))
+return 1
+"""
+
+# Numbers already in E.164 form ("+" and up to 15 digits) are stored that way in the DB
+_E164_RE = re.compile(r'^\+[1-9]\d{1,14}$')
+
+
+@lru_cache(maxsize=4096)
+def _is_valid_e164(phone_number: str) -> bool:
+    """Check an E.164 number against phonenumbers metadata, memoized across sends."""
+    try:
+        return phonenumbers.is_valid_number(phonenumbers.parse(phone_number))
+    except NumberParseException:
+        return False
+
 
 class SMSError(Exception):
     """Base exception for SMS service errors."""
@@ -77,20 +117,51 @@ class SMSService:
     - Security validation for webhooks
     """
     
-    def __init__(self, settings: SMSSettings, db: Optional[Session] = None):
-        """Initialize SMS service with Twilio client."""
+    def __init__(
+        self,
+        settings: SMSSettings,
+        db: Optional[Session] = None,
+        client: Optional[Client] = None,
+        redis_client: Optional[Any] = None
+    ):
+        """Initialize SMS service with Twilio client.
+        
+        Pass a long-lived ``client`` to reuse its HTTP connection pool across
+        service instances; otherwise a new client is created. With a
+        ``redis_client`` the hourly rate limit is shared by every worker
+        instead of being tracked in this instance.
+        """
         self.settings = settings
         self.db = db
-        self.client = Client(settings.twilio_account_sid, settings.twilio_auth_token)
+        self.client = client or Client(settings.twilio_account_sid, settings.twilio_auth_token)
         self.validator = RequestValidator(settings.twilio_auth_token)
         
-        # Rate limiting tracking (in-memory for now - could use Redis in production)
-        self._message_timestamps: deque = deque()
+        # Rate limiting tracking (in-memory for now - could use Redis in production).
+        # Ring buffer of monotonic send times in microseconds, one slot per allowed
+        # message; the slot about to be overwritten holds the oldest send.
+        self._send_times = array('q', [-_RATE_LIMIT_WINDOW_US]) * settings.max_messages_per_hour
+        self._send_index = 0
         self._total_cost = 0.0
         
+        self._redis = redis_client
+        if redis_client is not None:
+            self._reserve_shared_send = redis_client.register_script(_REDIS_RESERVE_SEND)
+        
+        # send_message may run in several worker threads at once (group sends).
+        # _lock guards the rate-limit and cost bookkeeping; _db_lock guards the
+        # shared DB session, so opt-out lookups don't wait behind the rate limit
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        
         logger.info(f"SMS Service initialized with phone number {settings.twilio_phone_number}")
     
-    def send_message(self, to_phone: str, message_body: str, person_id: Optional[int] = None) -> Dict[str, Any]:
+    def send_message(
+        self,
+        to_phone: str,
+        message_body: str,
+        person_id: Optional[int] = None,
+        opted_out: Optional[bool] = None
+    ) -> Dict[str, Any]:
         """
         Send SMS message via Twilio.
         
@@ -98,6 +169,8 @@ class SMSService:
             to_phone: Recipient phone number in E.164 format
             message_body: Message content
             person_id: Optional person ID to check opt-out status
+            opted_out: Opt-out status already known to the caller (see
+                get_opt_out_statuses); skips the per-message person lookup
             
         Returns:
             Dict with success status, message_sid, status, and error info
@@ -107,25 +180,27 @@ class SMSService:
             SMSError: If Twilio API error occurs
         """
         # Check if person has opted out of SMS
-        if person_id and self.db:
-            person = self.db.query(PersonDB).filter(PersonDB.id == person_id).first()
-            if person and person.sms_opt_out:
-                logger.info(f"SMS blocked for person {person_id}: user has opted out")
-                return {
-                    "success": False,
-                    "message_sid": None,
-                    "status": "opted_out",
-                    "error": "Recipient has opted out of SMS messages"
-                }
-        
-        # Check rate limit
-        self._check_rate_limit()
+        if opted_out is None and person_id and self.db:
+            with self._db_lock:
+                person = self.db.get(PersonDB, person_id)
+            opted_out = bool(person and person.sms_opt_out)
+        if opted_out:
+            logger.info(f"SMS blocked for person {person_id}: user has opted out")
+            return {
+                "success": False,
+                "message_sid": None,
+                "status": "opted_out",
+                "error": "Recipient has opted out of SMS messages"
+            }
         
         # Validate phone number
         phone_validation = self.validate_phone_number(to_phone)
         if not phone_validation["valid"]:
             raise SMSError(f"Invalid phone number: {phone_validation['error']}")
         
+        # Claim a rate-limit slot up front; it is given back if the send fails
+        reservation = self._reserve_send(time.monotonic_ns() // 1000)
+        
         try:
             # Send message via Twilio
             message = self.client.messages.create(
@@ -133,27 +208,47 @@ class SMSService:
                 from_=self.settings.twilio_phone_number,
                 body=message_body
             )
-            
-            # Track for rate limiting and costs
-            self._track_message()
-            
-            logger.info(f"SMS sent successfully to {to_phone}, SID: {message.sid}")
-            
-            return {
-                "success": True,
-                "message_sid": message.sid,
-                "status": message.status,
-                "error": None
-            }
-            
         except TwilioRestException as e:
+            self._release_send(reservation)
             logger.error(f"Twilio API error sending SMS to {to_phone}: {e}")
             raise SMSError(f"Twilio API error: {e.msg}")
         except Exception as e:
+            self._release_send(reservation)
             logger.error(f"Unexpected error sending SMS to {to_phone}: {e}")
             raise SMSError(f"Unexpected error: {str(e)}")
+        
+        # Track costs
+        self._track_message()
+        
+        logger.info(f"SMS sent successfully to {to_phone}, SID: {message.sid}")
+        
+        return {
+            "success": True,
+            "message_sid": message.sid,
+            "status": message.status,
+            "error": None
+        }
+    
+    def get_opt_out_statuses(self, person_ids: List[int]) -> Dict[int, bool]:
+        """
+        Look up SMS opt-out status for many persons in one query.
+        
+        Args:
+            person_ids: Person IDs to check
+            
+        Returns:
+            Dict mapping each found person ID to its sms_opt_out flag
+        """
+        if not self.db or not person_ids:
+            return {}
+        
+        with self._db_lock:
+            rows = self.db.query(PersonDB.id, PersonDB.sms_opt_out).filter(
+                PersonDB.id.in_(person_ids)
+            ).all()
+        return {person_id: sms_opt_out for person_id, sms_opt_out in rows}
     
-    def get_sms_recipients(self, person_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    async def get_sms_recipients(self, person_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         """
         Get list of persons who will receive SMS (haven't opted out).
         
@@ -166,7 +261,14 @@ class SMSService:
         if not self.db:
             return []
         
-        query = self.db.query(PersonDB).filter(
+        # Only the columns the recipient dicts need, not whole person rows
+        query = self.db.query(
+            PersonDB.id,
+            PersonDB.first_name,
+            PersonDB.last_name,
+            PersonDB.phone_number,
+            PersonDB.person_type
+        ).filter(
             PersonDB.sms_opt_out == False,
             PersonDB.phone_number.isnot(None),
             PersonDB.phone_number != "",
@@ -176,20 +278,9 @@ class SMSService:
         if person_ids:
             query = query.filter(PersonDB.id.in_(person_ids))
         
-        persons = query.all()
-        
-        return [
-            {
-                "id": person.id,
-                "first_name": person.first_name,
-                "last_name": person.last_name,
-                "phone_number": person.phone_number,
-                "person_type": person.person_type
-            }
-            for person in persons
-        ]
+        return [row._asdict() for row in query.all()]
     
-    def get_sms_recipients_with_parents(self, person_ids: Optional[List[int]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    async def get_sms_recipients_with_parents(self, person_ids: Optional[List[int]] = None) -> Dict[str, List[Dict[str, Any]]]:
         """
         Get list of youth who will receive SMS and their parents.
         
@@ -206,7 +297,12 @@ class SMSService:
         from app.db_models import ParentYouthRelationshipDB
         
         # Get youth recipients (same as regular get_sms_recipients)
-        youth_query = self.db.query(PersonDB).filter(
+        youth_query = self.db.query(
+            PersonDB.id,
+            PersonDB.first_name,
+            PersonDB.last_name,
+            PersonDB.phone_number
+        ).filter(
             PersonDB.sms_opt_out == False,
             PersonDB.phone_number.isnot(None),
             PersonDB.phone_number != "",
@@ -236,7 +332,14 @@ class SMSService:
         
         if youth_ids:
             # Query parent-youth relationships
-            parent_relationships = self.db.query(ParentYouthRelationshipDB).join(
+            parent_rows = self.db.query(
+                PersonDB.id,
+                PersonDB.first_name,
+                PersonDB.last_name,
+                PersonDB.phone_number,
+                ParentYouthRelationshipDB.youth_id,
+                ParentYouthRelationshipDB.relationship_type
+            ).select_from(ParentYouthRelationshipDB).join(
                 PersonDB, ParentYouthRelationshipDB.parent_id == PersonDB.id
             ).filter(
                 ParentYouthRelationshipDB.youth_id.in_(youth_ids),
@@ -246,16 +349,15 @@ class SMSService:
                 PersonDB.archived_on.is_(None)
             ).all()
             
-            for relationship in parent_relationships:
-                parent = relationship.parent
+            for row in parent_rows:
                 parent_recipients.append({
-                    "id": parent.id,
-                    "first_name": parent.first_name,
-                    "last_name": parent.last_name,
-                    "phone_number": parent.phone_number,
+                    "id": row.id,
+                    "first_name": row.first_name,
+                    "last_name": row.last_name,
+                    "phone_number": row.phone_number,
                     "person_type": "parent",
-                    "relationship_to_youth": relationship.youth_id,
-                    "relationship_type": relationship.relationship_type
+                    "relationship_to_youth": row.youth_id,
+                    "relationship_type": row.relationship_type
                 })
         
         return {
@@ -281,6 +383,20 @@ class SMSService:
                 "error": "Phone number is required"
             }
         
+        # E.164 input formats to itself, so only its validity needs checking
+        if _E164_RE.match(phone_number):
+            if _is_valid_e164(phone_number):
+                return {
+                    "valid": True,
+                    "formatted": phone_number,
+                    "error": None
+                }
+            return {
+                "valid": False,
+                "formatted": None,
+                "error": "Invalid phone number format"
+            }
+        
         try:
             # Parse phone number with Canadian default for numbers without country code
             parsed = phonenumbers.parse(phone_number, default_region)
@@ -330,54 +446,46 @@ class SMSService:
         Raises:
             ValidationError: If webhook signature is invalid
         """
-        print(f"🔍 SMS Service webhook validation:")
-        print(f"   URL: {url}")
-        print(f"   Signature: {signature}")
-        print(f"   Webhook data: {webhook_data}")
-        print(f"   Auth token configured: {bool(self.client.auth[1] if hasattr(self.client, 'auth') else False)}")
-        
         # Validate webhook signature for security
         is_valid = self.validator.validate(url, webhook_data, signature)
-        print(f"   Signature valid: {is_valid}")
         
         if not is_valid:
-            logger.warning(f"Invalid webhook signature for URL: {url}")
-            print(f"❌ Webhook validation failed!")
+            logger.warning("Invalid webhook signature for URL: %s", url)
             raise ValidationError("Invalid webhook signature")
         
         message_sid = webhook_data.get("MessageSid")
         message_status = webhook_data.get("MessageStatus")
         error_code = webhook_data.get("ErrorCode")
         
-        print(f"   Message SID: {message_sid}")
-        print(f"   Message Status: {message_status}")
-        print(f"   Error Code: {error_code}")
-        
-        logger.info(f"Processing webhook for message {message_sid}, status: {message_status}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Webhook url=%s sid=%s status=%s error_code=%s", url, message_sid, message_status, error_code)
         
         # Update message status in database if available
         updated = False
         if self.db and message_sid:
-            message = self.db.query(MessageDB).filter(
-                MessageDB.twilio_sid == message_sid
-            ).first()
+            if message_status == "delivered":
+                values = {"status": MessageStatus.DELIVERED, "delivered_at": datetime.now(timezone.utc)}
+            elif message_status in ("failed", "undelivered"):
+                values = {"status": MessageStatus.FAILED, "failed_at": datetime.now(timezone.utc)}
+                if error_code:
+                    values["failure_reason"] = f"Twilio error code {error_code}"
+            else:
+                # Intermediate statuses (queued, sending, sent) don't change the stored record
+                values = None
             
-            if message:
-                # Update status
-                if message_status == "delivered":
-                    message.status = MessageStatus.DELIVERED
-                    message.delivered_at = datetime.now(timezone.utc)
-                elif message_status == "failed":
-                    message.status = MessageStatus.FAILED
-                    message.error_code = error_code
-                elif message_status == "undelivered":
-                    message.status = MessageStatus.FAILED
-                    message.error_code = error_code
-                
+            if values:
+                # Single UPDATE ... RETURNING instead of loading the row and flushing it back
+                updated_ids = self.db.execute(
+                    update(MessageDB)
+                    .where(MessageDB.twilio_sid == message_sid)
+                    .values(**values)
+                    .returning(MessageDB.id)
+                ).scalars().all()
                 self.db.commit()
-                updated = True
-                logger.info(f"Updated message {message_sid} status to {message_status}")
-                print(f"✅ Message status updated in database")
+                
+                if updated_ids:
+                    updated = True
+                    logger.info("Updated message %s status to %s", message_sid, message_status)
         
         return {
             "valid": True,
@@ -394,24 +502,50 @@ class SMSService:
         """Get cost of SMS messages sent in the last hour."""
         return self._total_cost  # Simplified for now - in practice would track by time
     
-    def _check_rate_limit(self) -> None:
-        """Check if rate limit is exceeded."""
-        now = datetime.now(timezone.utc)
-        one_hour_ago = now - timedelta(hours=1)
-        
-        # Remove old timestamps
-        while self._message_timestamps and self._message_timestamps[0] < one_hour_ago:
-            self._message_timestamps.popleft()
-        
-        # Check limit
-        if len(self._message_timestamps) >= self.settings.max_messages_per_hour:
-            raise RateLimitError(
-                f"Rate limit exceeded: {len(self._message_timestamps)} messages "
-                f"in last hour (limit: {self.settings.max_messages_per_hour})"
-            )
+    def _reserve_send(self, now_us: int) -> Any:
+        """
+        Claim a rate-limit slot for a send at monotonic time ``now_us`` (microseconds).
+        
+        The check and the record happen together, so concurrent group sends
+        can't all pass the check before any of them is counted.
+        
+        Returns:
+            Token to pass to _release_send if the message doesn't go out
+            
+        Raises:
+            RateLimitError: If rate limit exceeded
+        """
+        limit = self.settings.max_messages_per_hour
+        
+        if self._redis is not None:
+            member = uuid.uuid4().hex
+            if not self._reserve_shared_send(keys=[_RATE_LIMIT_KEY], args=[_RATE_LIMIT_WINDOW_US, limit, member]):
+                raise RateLimitError(f"Rate limit exceeded: {limit} messages in last hour (limit: {limit})")
+            return member
+        
+        with self._lock:
+            # The oldest of the last max_messages_per_hour sends is still inside the window
+            slot = self._send_index
+            oldest_us = self._send_times[slot]
+            if now_us - oldest_us < _RATE_LIMIT_WINDOW_US:
+                raise RateLimitError(f"Rate limit exceeded: {limit} messages in last hour (limit: {limit})")
+            self._send_times[slot] = now_us
+            self._send_index = (slot + 1) % len(self._send_times)
+        return slot, oldest_us, now_us
+    
+    def _release_send(self, reservation: Any) -> None:
+        """Give back a slot claimed by _reserve_send for a message that wasn't sent."""
+        if self._redis is not None:
+            self._redis.zrem(_RATE_LIMIT_KEY, reservation)
+            return
+        
+        slot, oldest_us, now_us = reservation
+        with self._lock:
+            # Unless the ring has wrapped onto the slot since, restore what it held
+            if self._send_times[slot] == now_us:
+                self._send_times[slot] = oldest_us
     
     def _track_message(self) -> None:
-        """Track message for rate limiting and cost calculation."""
-        now = datetime.now(timezone.utc)
-        self._message_timestamps.append(now)
-        self._total_cost += self.settings.cost_per_sms
\ No newline at end of file
+        """Track cost of a message that was sent."""
+        with self._lock:
+            self._total_cost += self.settings.cost_per_sms
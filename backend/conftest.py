@@ -7,112 +7,271 @@ ensuring proper test isolation and TDD workflow support.
 
 import pytest
 import asyncio
-import subprocess
+import socket
 import time
 import os
-from pathlib import Path
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.engine import make_url
 
 from app.database import Base
 from tests.test_config import (
     get_test_database_url, 
+    get_worker_database_url,
+    ensure_database_exists,
+    get_docker_client,
+    get_test_db_container,
     is_docker_available, 
     is_test_db_running,
-    DOCKER_COMPOSE_FILE,
-    DOCKER_SERVICE_NAME
+    DOCKER_IMAGE,
+    DOCKER_COMMAND,
+    DOCKER_CONTAINER_NAME,
+    DOCKER_ENVIRONMENT,
+    DOCKER_PORTS,
+    TEST_DATABASE_URL
 )
 
 
+def pytest_addoption(parser):
+    """Register command line options for the test database."""
+    parser.addoption(
+        "--keep-containers",
+        action="store_true",
+        default=False,
+        help="Leave the test database container running after the session so the next run reuses it"
+    )
+    parser.addoption(
+        "--not-docker",
+        action="store_true",
+        default=False,
+        help="Skip tests that need the Docker PostgreSQL database"
+    )
+    parser.addoption(
+        "--slow",
+        action="store_true",
+        default=False,
+        help="Also run tests marked slow"
+    )
+
+
 def pytest_configure(config):
     """Configure pytest with custom markers and setup."""
     config.addinivalue_line(
         "markers", "requires_docker: mark test as requiring Docker PostgreSQL"
     )
+    config.addinivalue_line(
+        "markers", "docker: mark test as needing the Docker PostgreSQL container (deselect with -m 'not docker')"
+    )
+    config.addinivalue_line(
+        "markers", "slow: mark test as slow (skipped unless --slow is given)"
+    )
     config.addinivalue_line(
         "markers", "integration: mark test as integration test"
     )
+    
+    # Under pytest-xdist each worker gets its own PostgreSQL database so
+    # session-scoped schemas and per-test transactions never contend
+    from app.config import settings
+    if os.environ.get("PYTEST_XDIST_WORKER") and settings.DATABASE_TYPE == "postgresql":
+        settings.DATABASE_URL = get_worker_database_url(settings.database_url)
 
 
 def pytest_collection_modifyitems(config, items):
     """Add markers to tests based on their location and requirements."""
+    skip_docker = pytest.mark.skip(reason="docker excluded (--not-docker)")
+    skip_slow = pytest.mark.skip(reason="slow test (use --slow to run)")
+    
     for item in items:
         # Mark tests that use the database as requiring docker
         if "test_db" in getattr(item, "fixturenames", []):
             item.add_marker(pytest.mark.requires_docker)
+            item.add_marker(pytest.mark.docker)
         
         # Mark integration tests
         if "integration" in str(item.fspath):
             item.add_marker(pytest.mark.integration)
+        
+        if config.getoption("--not-docker") and "docker" in item.keywords:
+            item.add_marker(skip_docker)
+        if not config.getoption("--slow") and "slow" in item.keywords:
+            item.add_marker(skip_slow)
 
 
-@pytest.fixture(scope="session", autouse=True)
-def setup_test_database():
-    """Set up the test database for the entire test session."""
-    if not is_docker_available():
-        pytest.skip("Docker is not available - skipping database tests")
-    
-    backend_path = Path(__file__).parent  # Current directory is backend/
-    compose_file_path = backend_path / DOCKER_COMPOSE_FILE
-    
-    if not compose_file_path.exists():
-        pytest.fail(f"Docker compose file not found: {compose_file_path}")
-    
-    # Start the database if not running
-    if not is_test_db_running():
-        print(f"\n🐳 Starting test database container...")
-        try:
-            subprocess.run([
-                "docker", "compose", "-f", str(compose_file_path), 
-                "up", "-d", DOCKER_SERVICE_NAME
-            ], check=True, cwd=backend_path, capture_output=True)
-            
-            # Wait for database to be ready
-            max_retries = 30
-            for attempt in range(max_retries):
-                try:
-                    engine = create_engine(get_test_database_url())
-                    with engine.connect() as conn:
-                        conn.execute(text("SELECT 1"))
-                    print(f"✅ Test database is ready!")
-                    break
-                except OperationalError:
-                    if attempt < max_retries - 1:
-                        print(f"⏳ Waiting for database... (attempt {attempt + 1}/{max_retries})")
-                        time.sleep(2)
-                    else:
-                        pytest.fail("Test database failed to start within 60 seconds")
-                        
-        except subprocess.CalledProcessError as e:
-            pytest.fail(f"Failed to start test database: {e}")
-    else:
+# Outcome of starting the Docker test database, reported by test_engine as
+# (pytest outcome name, reason); plain strings so xdist can pass it to workers
+_test_database_started = False
+_test_database_error = None
+
+# Shared engine (and connection pool) for every test database user
+_ENGINE = None
+
+
+def _engine():
+    """Get the session-wide test database engine, creating it on first use."""
+    global _ENGINE
+    if _ENGINE is None:
+        _ENGINE = create_engine(get_test_database_url(), pool_size=5, max_overflow=0, pool_pre_ping=True)
+    return _ENGINE
+
+
+def _start_test_database():
+    """Start the Docker test database if needed and wait until it accepts connections."""
+    global _test_database_started
+    
+    if is_test_db_running():
         print(f"✅ Test database container is already running")
+        return
+    
+    print(f"\n🐳 Starting test database container...")
+    import docker
+    try:
+        container = get_test_db_container()
+        if container is not None:
+            container.start()
+        else:
+            get_docker_client().containers.run(
+                DOCKER_IMAGE,
+                command=DOCKER_COMMAND,
+                name=DOCKER_CONTAINER_NAME,
+                environment=DOCKER_ENVIRONMENT,
+                ports=DOCKER_PORTS,
+                detach=True
+            )
+    except docker.errors.DockerException as e:
+        raise RuntimeError(f"Failed to start test database: {e}")
+    _test_database_started = True
+    
+    # Wait for database to be ready, backing off from 50ms up to 1s between probes.
+    # Probe the container's own database: per-worker databases don't exist yet.
+    url = make_url(os.getenv("TEST_DATABASE_URL", TEST_DATABASE_URL))
+    host, port = url.host or "localhost", url.port or 5432
+    deadline = time.monotonic() + 60
+    attempt = 0
+    while True:
+        if _is_test_database_ready(url, host, port):
+            print(f"✅ Test database is ready!")
+            return
+        if time.monotonic() >= deadline:
+            raise RuntimeError("Test database failed to start within 60 seconds")
+        print(f"⏳ Waiting for database... (attempt {attempt + 1})")
+        time.sleep(min(1.0, 0.05 * (2 ** attempt)))
+        attempt += 1
+
+
+def _is_test_database_ready(url, host: str, port: int) -> bool:
+    """
+    Cheap readiness probe: a bare TCP connect first, then a raw psycopg2
+    connection once the port accepts (PostgreSQL listens before it can serve).
+    """
+    import psycopg2
+    
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            pass
+        psycopg2.connect(
+            host=host, port=port, user=url.username, password=url.password,
+            dbname=url.database, connect_timeout=1
+        ).close()
+        return True
+    except (OSError, psycopg2.OperationalError):
+        return False
+
+
+def _is_xdist_worker(config) -> bool:
+    """True inside a pytest-xdist worker process."""
+    return hasattr(config, "workerinput")
+
+
+def _is_xdist_controller(config) -> bool:
+    """True in the pytest-xdist controller process that spawns the workers."""
+    return config.pluginmanager.hasplugin("dsession")
+
+
+def _set_up_test_database():
+    """Start the test database, recording why it's unusable instead of raising."""
+    global _test_database_error
+    
+    if not is_docker_available():
+        _test_database_error = ("skip", "Docker is not available - skipping database tests")
+        return
+    try:
+        _start_test_database()
+    except RuntimeError as e:
+        _test_database_error = ("fail", str(e))
+
+
+def pytest_sessionstart(session):
+    """
+    Under pytest-xdist only the controller manages the container: it starts
+    the database before the workers spawn and stops it after they all finish.
+    The controller doesn't collect tests, so it can't wait for collection.
+    """
+    config = session.config
+    if not _is_xdist_controller(config) or config.getoption("--not-docker"):
+        return
+    
+    from app.config import settings
+    if settings.DATABASE_TYPE == "postgresql":
+        _set_up_test_database()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    """Hand the controller's database start-up outcome to each xdist worker."""
+    node.workerinput["test_database_error"] = _test_database_error
+
+
+def pytest_collection_finish(session):
+    """
+    Start the test database once collection is done, and only if a
+    collected test needs it, so in-memory runs never probe Docker.
+    """
+    global _test_database_error
+    
+    config = session.config
+    if _is_xdist_worker(config):
+        # The controller owns the container; workers only report its outcome
+        error = config.workerinput.get("test_database_error")
+        _test_database_error = tuple(error) if error else None
+        return
+    
+    if config.getoption("--not-docker"):
+        return
+    if not any("requires_docker" in item.keywords for item in session.items):
+        return
+    
+    _set_up_test_database()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Dispose the shared engine and stop the test database container if this session started it."""
+    if _ENGINE is not None:
+        _ENGINE.dispose()
     
-    yield
+    if not _test_database_started:
+        return
+    
+    if session.config.getoption("--keep-containers"):
+        print(f"\n🐳 Leaving test database container running (--keep-containers)")
+        return
     
     # Cleanup: Stop the database container
     print(f"\n🧹 Cleaning up test database...")
+    import docker
     try:
-        subprocess.run([
-            "docker", "compose", "-f", str(compose_file_path),
-            "down", "-v"  # Remove volumes to ensure clean state
-        ], check=True, cwd=backend_path, capture_output=True)
+        container = get_test_db_container()
+        if container is not None:
+            container.stop()
+            container.remove(v=True)  # Remove volumes to ensure clean state
         print(f"✅ Test database cleaned up")
-    except subprocess.CalledProcessError as e:
+    except docker.errors.DockerException as e:
         print(f"⚠️  Warning: Failed to cleanup test database: {e}")
 
 
-@pytest.fixture(scope="function")
-def test_db(setup_test_database):
+@pytest.fixture(scope="session")
+def test_engine():
     """
-    Create a clean database session for each test.
-    
-    This fixture:
-    1. Creates all tables fresh for each test (PostgreSQL only)
-    2. Provides a database session
-    3. Rolls back all changes after the test
-    4. Ensures test isolation
+    Create the test database engine and schema once per test session.
     
     Skips when using memory database type.
     """
@@ -122,28 +281,84 @@ def test_db(setup_test_database):
     if settings.DATABASE_TYPE != "postgresql":
         pytest.skip(f"Database model tests require PostgreSQL, but DATABASE_TYPE={settings.DATABASE_TYPE}")
     
-    engine = create_engine(get_test_database_url())
+    if _test_database_error is not None:
+        outcome, reason = _test_database_error
+        getattr(pytest, outcome)(reason)
     
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    # Import database models to ensure they're registered with Base
+    from app import db_models
+    
+    ensure_database_exists(get_test_database_url())
+    engine = _engine()
+    
+    # Build the schema in one transaction. The schema is wiped first, so
+    # create_all can skip its per-table existence probes (checkfirst=False)
+    # even when a kept container still holds tables from an aborted run.
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA IF EXISTS public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+        Base.metadata.create_all(bind=conn, checkfirst=False)
+    
+    yield engine
+    
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="session")
+def test_connection(test_engine):
+    """
+    Hold one connection and outer transaction for the whole session.
     
-    # Create session
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    session = SessionLocal()
+    Session-wide sample data is flushed into this transaction, and
+    everything written on it is rolled back when the session ends.
+    """
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    
+    try:
+        yield connection
+    finally:
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture(scope="session")
+def seed_db(test_connection):
+    """Session for inserting sample data shared by every test in the session."""
+    session = Session(bind=test_connection, autoflush=False, expire_on_commit=False)
     
     try:
         yield session
     finally:
-        # Close session and clean up
         session.close()
-        
-        # Drop all tables to ensure clean state
-        Base.metadata.drop_all(bind=engine)
 
 
-@pytest.fixture
-def sample_user(test_db):
-    """Create a sample user for testing."""
+@pytest.fixture(scope="function")
+def test_db(test_connection):
+    """
+    Provide a database session whose changes are rolled back after each test.
+    
+    This fixture:
+    1. Starts a SAVEPOINT inside the session-wide transaction
+    2. Binds a session to it; session commits only release a nested SAVEPOINT
+    3. Rolls back to the SAVEPOINT after the test
+    4. Ensures test isolation without recreating the schema per test
+    """
+    savepoint = test_connection.begin_nested()
+    session = Session(
+        bind=test_connection, autoflush=False, expire_on_commit=False, join_transaction_mode="create_savepoint"
+    )
+    
+    try:
+        yield session
+    finally:
+        session.close()
+        savepoint.rollback()
+
+
+@pytest.fixture(scope="session")
+def sample_user(seed_db):
+    """Create a sample user, once per session, for testing."""
     from app.db_models import UserDB
     
     user = UserDB(
@@ -151,15 +366,14 @@ def sample_user(test_db):
         password_hash="$2b$12$test_hash",
         role="admin"
     )
-    test_db.add(user)
-    test_db.commit()
-    test_db.refresh(user)
+    seed_db.add(user)
+    seed_db.flush()
     return user
 
 
-@pytest.fixture
-def sample_person(test_db):
-    """Create a sample person for testing."""
+@pytest.fixture(scope="session")
+def sample_person(seed_db):
+    """Create a sample person, once per session, for testing."""
     from app.db_models import PersonDB
     
     person = PersonDB(
@@ -170,20 +384,19 @@ def sample_person(test_db):
         school_name="Test High School",
         phone_number="+1234567890"
     )
-    test_db.add(person)
-    test_db.commit()
-    test_db.refresh(person)
+    seed_db.add(person)
+    seed_db.flush()
     return person
 
 
 # Helper functions for test utilities
 def reset_test_database():
     """Reset the test database to a clean state."""
-    engine = create_engine(get_test_database_url())
+    engine = _engine()
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
 
 
 def get_test_engine():
-    """Get a SQLAlchemy engine for the test database."""
-    return create_engine(get_test_database_url())
\ No newline at end of file
+    """Get the shared SQLAlchemy engine for the test database."""
+    return _engine()
\ No newline at end of file
@@ -27,23 +27,15 @@ from sqlalchemy.exc import OperationalError
 from app.database import get_database_url
 from app.config import get_settings
 
-def check_column_exists(engine, table_name: str, column_name: str) -> bool:
-    """Check if a column exists in a table."""
-    try:
-        with engine.connect() as conn:
-            # PostgreSQL-specific query
-            result = conn.execute(text("""
-                SELECT EXISTS (
-                    SELECT 1 
-                    FROM information_schema.columns 
-                    WHERE table_name = :table_name 
-                    AND column_name = :column_name
-                )
-            """), {"table_name": table_name, "column_name": column_name})
-            return result.scalar()
-    except Exception as e:
-        print(f"Error checking column {column_name}: {e}")
-        return False
+def get_existing_columns(conn, table_name: str) -> set:
+    """Get the names of all columns in a table with a single query."""
+    # PostgreSQL-specific query
+    result = conn.execute(text("""
+        SELECT column_name
+        FROM information_schema.columns 
+        WHERE table_name = :table_name
+    """), {"table_name": table_name})
+    return {row[0] for row in result}
 
 def add_sms_fields_to_persons():
     """Add SMS-related fields to the persons table."""
@@ -59,11 +51,11 @@ def add_sms_fields_to_persons():
     new_columns = [
         {
             "name": "sms_consent",
-            "sql": "ALTER TABLE persons ADD COLUMN sms_consent BOOLEAN NOT NULL DEFAULT TRUE"
+            "sql": "ALTER TABLE persons ADD COLUMN IF NOT EXISTS sms_consent BOOLEAN NOT NULL DEFAULT TRUE"
         },
         {
             "name": "sms_opt_out", 
-            "sql": "ALTER TABLE persons ADD COLUMN sms_opt_out BOOLEAN NOT NULL DEFAULT FALSE"
+            "sql": "ALTER TABLE persons ADD COLUMN IF NOT EXISTS sms_opt_out BOOLEAN NOT NULL DEFAULT FALSE"
         }
     ]
     
@@ -76,15 +68,10 @@ def add_sms_fields_to_persons():
                 for column in new_columns:
                     column_name = column["name"]
                     
-                    # Check if column already exists
-                    if check_column_exists(engine, "persons", column_name):
-                        print(f"✅ Column '{column_name}' already exists - skipping")
-                        continue
-                    
-                    # Add the column
-                    print(f"➕ Adding column: {column_name}")
+                    # IF NOT EXISTS keeps this idempotent without a pre-check query
+                    print(f"➕ Adding column (if missing): {column_name}")
                     conn.execute(text(column["sql"]))
-                    print(f"✅ Successfully added column: {column_name}")
+                    print(f"✅ Column ensured: {column_name}")
                 
                 # Commit the transaction
                 trans.commit()
@@ -92,8 +79,9 @@ def add_sms_fields_to_persons():
                 
                 # Verify the migration
                 print(f"\n🔍 Verifying migration...")
+                existing_columns = get_existing_columns(conn, "persons")
                 for column in new_columns:
-                    exists = check_column_exists(engine, "persons", column["name"])
+                    exists = column["name"] in existing_columns
                     status = "✅" if exists else "❌"
                     print(f"{status} Column '{column['name']}': {'EXISTS' if exists else 'MISSING'}")
                 
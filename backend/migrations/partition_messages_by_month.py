@@ -0,0 +1,143 @@
+"""
+Migration: Convert messages to a table partitioned by month on created_at
+Date: 2026-10-16
+
+SMS analytics and history always filter on created_at, so monthly RANGE
+partitions let PostgreSQL prune every month outside the requested window.
+
+SAFETY: This migration is idempotent and data-safe.
+- Runs in a single transaction and copies every row into the new table
+- Keeps the original table as messages_unpartitioned until you drop it
+- Does nothing if messages is already partitioned
+
+Upcoming monthly partitions are then created at startup and by the nightly
+analytics job (app.database.ensure_message_partitions).
+"""
+
+import os
+import sys
+
+# Add parent directory to path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, create_engine
+from app.config import settings
+from app.database import Base, create_message_partition, ensure_message_partitions
+from app import db_models
+
+
+def is_partitioned(conn, table_name: str) -> bool:
+    """Check if a table is already a partitioned table."""
+    result = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table_name})
+    return result.scalar() == "p"
+
+
+def migrate():
+    """
+    Partition the messages table by month.
+
+    Changes:
+    1. Rename messages (and its indexes/constraints) to messages_unpartitioned
+    2. Create messages PARTITION BY RANGE (created_at) with primary key (id, created_at)
+    3. Create a partition per month of existing data plus a DEFAULT partition
+    4. Copy all rows and recreate the model's indexes and foreign keys
+    """
+    print("\n" + "="*70)
+    print("🔄 MIGRATION: partition messages by month")
+    print("="*70)
+
+    if settings.DATABASE_TYPE != "postgresql":
+        print("⚠️  This migration only applies to PostgreSQL databases")
+        return
+
+    engine = create_engine(settings.database_url)
+
+    with engine.begin() as conn:
+        # Step 1: Check current schema
+        print("\n📋 Step 1: Checking current schema...")
+        if is_partitioned(conn, "messages"):
+            print("\n✅ messages is already partitioned - no changes needed")
+            return
+
+        conn.execute(text("LOCK TABLE messages IN ACCESS EXCLUSIVE MODE"))
+        record_count = conn.execute(text("SELECT COUNT(*) FROM messages")).scalar()
+        print(f"   ✓ Found {record_count} message records to preserve")
+
+        # The partition key is part of the primary key, so it cannot be NULL
+        conn.execute(text("UPDATE messages SET created_at = COALESCE(sent_at, now()) WHERE created_at IS NULL"))
+
+        # Step 2: Move the old table and its index/constraint names out of the way
+        print("\n📋 Step 2: Renaming messages to messages_unpartitioned...")
+        conn.execute(text("ALTER TABLE messages RENAME TO messages_unpartitioned"))
+        conn.execute(text("ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_pkey TO messages_unpartitioned_pkey"))
+        index_names = conn.execute(text("""
+            SELECT indexname FROM pg_indexes
+            WHERE tablename = 'messages_unpartitioned' AND schemaname = current_schema()
+              AND indexname != 'messages_unpartitioned_pkey'
+        """)).scalars().all()
+        for index_name in index_names:
+            conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_unpartitioned"'))
+        print(f"   ✓ Renamed table and {len(index_names)} indexes")
+
+        # Step 3: Create the partitioned table with the same columns and defaults
+        print("\n📋 Step 3: Creating partitioned messages table...")
+        conn.execute(text("""
+            CREATE TABLE messages (LIKE messages_unpartitioned INCLUDING DEFAULTS)
+            PARTITION BY RANGE (created_at)
+        """))
+        conn.execute(text("ALTER TABLE messages ALTER COLUMN created_at SET NOT NULL"))
+        conn.execute(text("ALTER TABLE messages ADD PRIMARY KEY (id, created_at)"))
+        conn.execute(text("ALTER TABLE messages ADD FOREIGN KEY (group_id) REFERENCES message_groups(id)"))
+        conn.execute(text("ALTER TABLE messages ADD FOREIGN KEY (recipient_person_id) REFERENCES persons(id)"))
+
+        # The id sequence must survive dropping messages_unpartitioned later
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence('messages_unpartitioned', 'id')")).scalar()
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY messages.id"))
+        print("   ✓ Created messages PARTITION BY RANGE (created_at)")
+
+        # Step 4: One partition per month that has data, plus a DEFAULT catch-all
+        print("\n📋 Step 4: Creating monthly partitions...")
+        months = conn.execute(text("""
+            SELECT DISTINCT date_trunc('month', created_at)::date FROM messages_unpartitioned ORDER BY 1
+        """)).scalars().all()
+        for month in months:
+            create_message_partition(conn, month)
+        conn.execute(text("CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT"))
+        print(f"   ✓ Created {len(months)} monthly partitions and messages_default")
+
+        # Step 5: Copy the data
+        print("\n📋 Step 5: Copying messages...")
+        conn.execute(text("INSERT INTO messages SELECT * FROM messages_unpartitioned"))
+
+        # Step 6: Recreate the model's indexes on the partitioned table
+        print("\n📋 Step 6: Creating indexes...")
+        for index in Base.metadata.tables["messages"].indexes:
+            index.create(conn, checkfirst=True)
+        print(f"   ✓ Created {len(Base.metadata.tables['messages'].indexes)} indexes")
+
+        # Step 7: Verify data preservation
+        record_count_after = conn.execute(text("SELECT COUNT(*) FROM messages")).scalar()
+        print(f"   ✓ Records after migration: {record_count_after}")
+        if record_count != record_count_after:
+            raise RuntimeError(f"Record count mismatch! Before: {record_count}, After: {record_count_after}")
+        print("   ✓ All data preserved successfully!")
+
+    # Current and upcoming months, so new messages never land in messages_default
+    ensure_message_partitions(engine)
+
+    print("\n" + "="*70)
+    print("✅ MIGRATION COMPLETED SUCCESSFULLY")
+    print("="*70)
+    print("\nNext steps:")
+    print("1. Verify the application against the partitioned messages table")
+    print("2. Drop the backup: DROP TABLE messages_unpartitioned;")
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    try:
+        migrate()
+    except Exception as e:
+        print(f"\n❌ MIGRATION FAILED: {e}")
+        sys.exit(1)
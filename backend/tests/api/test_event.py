@@ -1,215 +1,172 @@
-import pytest
-from fastapi.testclient import TestClient
-from app.main import app
-from app.repositories.memory import InMemoryEventRepository
-from tests.test_helpers import get_authenticated_client
-
-# Use authenticated client for all tests
-client = get_authenticated_client()
-EVENT_ENDPOINT = "/event"
+import datetime
+import json
 
 import pytest
-from fastapi.testclient import TestClient
-from app.main import app
-from app.repositories.memory import InMemoryEventRepository
-from tests.test_helpers import get_authenticated_client
+from pydantic import ValidationError
+from app import repositories
+from app.config import settings
+from app.models import EventPerson
 
-# Use authenticated client for all tests
-client = get_authenticated_client()
 EVENT_ENDPOINT = "/event"
 
+requires_pg = pytest.mark.skipif(settings.DATABASE_TYPE != "postgresql", reason="PostgreSQL only")
+requires_mem = pytest.mark.skipif(settings.DATABASE_TYPE == "postgresql", reason="in-memory repositories only")
+
 @pytest.fixture(autouse=True)
-def clear_event_store(clean_database):
+def clear_event_store(clean_database, memory_event_repo):
     """Clear event store for each test."""
-    # Get the memory repository instance and clear it
-    from app.repositories import get_event_repository
-    from app.database import get_db
-    from app.config import settings
-    
-    if settings.DATABASE_TYPE == "postgresql":
-        # Database cleaning is handled by clean_database fixture
-        pass
-    else:
-        # Create a mock session for memory repository
-        class MockSession:
-            pass
-        
-        mock_session = MockSession()
-        event_repo = get_event_repository(mock_session)
-        if isinstance(event_repo, InMemoryEventRepository):
-            event_repo.store.clear()
+    # With PostgreSQL, database cleaning is handled by the clean_database fixture
+    if memory_event_repo is not None:
+        # Re-install in case another client re-ran init_repositories
+        repositories.event_repo = memory_event_repo
+        memory_event_repo.store.clear()
 
-def make_checkin_checkout(event_date, check_in_time, check_out_time):
-    from zoneinfo import ZoneInfo
-    import datetime
-    check_in = datetime.datetime.combine(event_date, check_in_time, tzinfo=ZoneInfo("UTC"))
-    check_out = datetime.datetime.combine(event_date, check_out_time, tzinfo=ZoneInfo("UTC"))
-    return check_in.isoformat().replace("+00:00", "Z"), check_out.isoformat().replace("+00:00", "Z")
+@pytest.fixture(scope="session")
+def today():
+    """
+    The run's "today", read once. It has to be the real date: the days filter
+    on GET /events is evaluated against the server's clock.
+    """
+    return datetime.date.today()
 
-def make_event_payload(event_id, event_date, youth_info, leader_info):
-    payload = {
-        "id": event_id,
+
+@requires_pg
+def test_create_event_with_checkin_checkout_pg(client, today):
+    # For PostgreSQL, we need to create people first, then check them in separately
+    # Create a youth and leader first
+    youth_payload = {
+        "first_name": "Test",
+        "last_name": "Youth",
+        "birth_date": "2005-01-01",
+        "grade": 10,
+        "phone_number": "555-0001",
+        "emergency_contact_name": "Parent",
+        "emergency_contact_phone": "555-0002",
+        "emergency_contact_relationship": "Parent"
+    }
+    leader_payload = {
+        "first_name": "Test", 
+        "last_name": "Leader",
+        "birth_date": "1985-01-01",
+        "phone_number": "555-0003",
+        "role": "Youth Pastor"
+    }
+    
+    # Create the people
+    youth_response = client.post("/person", json=youth_payload)
+    assert youth_response.status_code in (200, 201)
+    youth_data = youth_response.json()
+    youth_id = youth_data["id"]
+    
+    leader_response = client.post("/person", json=leader_payload)
+    assert leader_response.status_code in (200, 201)
+    leader_data = leader_response.json()
+    leader_id = leader_data["id"]
+    
+    # Create event without attendance data
+    event_date = today
+    event_payload = {
         "date": event_date.isoformat(),
-        "youth": youth_info,
-        "leaders": leader_info
+        "name": "Test Event",
+        "desc": "Test event with checkin/checkout",
+        "start_time": "18:30",
+        "end_time": "21:30",
+        "location": "Test Location"
     }
-    return payload
-def test_create_event_with_valid_data():
-    """Test creating an event with valid EventCreate data"""
+    response = client.post(EVENT_ENDPOINT, json=event_payload)
+    assert response.status_code in (200, 201)
+    event_data = response.json()
+    event_id = event_data["id"]
+    
+    # Check in the youth and leader separately
+    youth_checkin_data = {"person_id": youth_id}
+    leader_checkin_data = {"person_id": leader_id}
+    
+    youth_checkin_response = client.post(f"/event/{event_id}/checkin", json=youth_checkin_data)
+    leader_checkin_response = client.post(f"/event/{event_id}/checkin", json=leader_checkin_data)
+    
+    # Get the updated event to verify attendance
+    response = client.get(f"/event/{event_id}")
+    assert response.status_code == 200
+    data = response.json()
+    
+    # In PostgreSQL mode, attendance might be stored differently
+    # Just verify the event was created successfully
+    assert data["id"] == event_id
+    assert data["name"] == "Test Event"
+
+@requires_mem
+def test_create_event_with_checkin_checkout_memory(client, today):
+    # Memory mode test - event creation doesn't include attendance data anymore
+    event_date = today
     payload = {
+        "date": event_date.isoformat(),
         "name": "Test Event",
-        "date": "2025-09-03",
-        "start_time": "19:00",
-        "end_time": "21:00",
+        "desc": "Test event with checkin/checkout",
+        "start_time": "18:30",
+        "end_time": "21:30",
         "location": "Test Location"
     }
     response = client.post(EVENT_ENDPOINT, json=payload)
-    assert response.status_code == 200
-    
+    assert response.status_code in (200, 201)
     data = response.json()
+    
+    # Verify event was created successfully with datetime fields
     assert data["name"] == "Test Event"
-    assert data["date"] == "2025-09-03"
-    assert data["start_time"] == "19:00"
-    assert data["end_time"] == "21:00"
-    assert data["location"] == "Test Location"
-    # Should have auto-generated datetime fields
+    assert data["date"] == event_date.isoformat()
+    assert data["start_time"] == "18:30"
+    assert data["end_time"] == "21:30"
     assert "start_datetime" in data
     assert "end_datetime" in data
+    # Attendance is managed separately, so youth/leaders arrays should be empty initially
+    assert len(data["youth"]) == 0
+    assert len(data["leaders"]) == 0
 
-def test_create_event_with_checkin_checkout():
-    import datetime
-    from app.config import settings
-    
-    # For PostgreSQL, we need to create people first, then check them in separately
-    if settings.DATABASE_TYPE == "postgresql":
-        # Create a youth and leader first
-        youth_payload = {
-            "first_name": "Test",
-            "last_name": "Youth",
-            "birth_date": "2005-01-01",
-            "grade": 10,
-            "phone_number": "555-0001",
-            "emergency_contact_name": "Parent",
-            "emergency_contact_phone": "555-0002",
-            "emergency_contact_relationship": "Parent"
-        }
-        leader_payload = {
-            "first_name": "Test", 
-            "last_name": "Leader",
-            "birth_date": "1985-01-01",
-            "phone_number": "555-0003",
-            "role": "Youth Pastor"
-        }
-        
-        # Create the people
-        youth_response = client.post("/person", json=youth_payload)
-        assert youth_response.status_code in (200, 201)
-        youth_data = youth_response.json()
-        youth_id = youth_data["id"]
-        
-        leader_response = client.post("/person", json=leader_payload)
-        assert leader_response.status_code in (200, 201)
-        leader_data = leader_response.json()
-        leader_id = leader_data["id"]
-        
-        # Create event without attendance data
-        event_date = datetime.date.today()
-        event_payload = {
-            "date": event_date.isoformat(),
-            "name": "Test Event",
-            "desc": "Test event with checkin/checkout",
-            "start_time": "18:30",
-            "end_time": "21:30",
-            "location": "Test Location"
-        }
-        response = client.post(EVENT_ENDPOINT, json=event_payload)
-        assert response.status_code in (200, 201)
-        event_data = response.json()
-        event_id = event_data["id"]
-        
-        # Check in the youth and leader separately
-        youth_checkin_data = {"person_id": youth_id}
-        leader_checkin_data = {"person_id": leader_id}
-        
-        youth_checkin_response = client.post(f"/event/{event_id}/checkin", json=youth_checkin_data)
-        leader_checkin_response = client.post(f"/event/{event_id}/checkin", json=leader_checkin_data)
-        
-        # Get the updated event to verify attendance
-        response = client.get(f"/event/{event_id}")
-        assert response.status_code == 200
-        data = response.json()
-        
-        # In PostgreSQL mode, attendance might be stored differently
-        # Just verify the event was created successfully
-        assert data["id"] == event_id
-        assert data["name"] == "Test Event"
-        
-    else:
-        # Memory mode test - event creation doesn't include attendance data anymore
-        event_date = datetime.date.today()
-        payload = {
-            "date": event_date.isoformat(),
-            "name": "Test Event",
-            "desc": "Test event with checkin/checkout",
-            "start_time": "18:30",
-            "end_time": "21:30",
-            "location": "Test Location"
-        }
-        response = client.post(EVENT_ENDPOINT, json=payload)
-        assert response.status_code in (200, 201)
-        data = response.json()
-        
-        # Verify event was created successfully with datetime fields
-        assert data["name"] == "Test Event"
-        assert data["date"] == event_date.isoformat()
-        assert data["start_time"] == "18:30"
-        assert data["end_time"] == "21:30"
-        assert "start_datetime" in data
-        assert "end_datetime" in data
-        # Attendance is managed separately, so youth/leaders arrays should be empty initially
-        assert len(data["youth"]) == 0
-        assert len(data["leaders"]) == 0
+# No name, start_time, end_time, location: should default/optional.
+# Shared by the cases below; copy it before mutating.
+_VALID_EVENT = {"date": "2025-09-01"}
 
-def valid_event_payload():
-    return {
-        "date": "2025-09-01",
-        # No name, start_time, end_time, location: should default/optional
-    }
+# Pre-encoded request body for tests that post the payload unchanged
+VALID_EVENT_BYTES = json.dumps(_VALID_EVENT).encode()
+JSON_HEADERS = {"content-type": "application/json"}
 
-def test_create_event_defaults_times_and_name():
-    payload = valid_event_payload()
-    response = client.post(EVENT_ENDPOINT, json=payload)
-    assert response.status_code in (200, 201)
-    data = response.json()
-    assert data["start_time"] == "19:00"
-    assert data["end_time"] == "21:00"
-    assert data["name"] == "Youth Group"
-    assert "location" not in data or data["location"] is None
-
-@pytest.mark.parametrize("field", ["date"])
-def test_missing_required_event_field_returns_422(field):
-    payload = valid_event_payload()
-    del payload[field]
-    response = client.post(EVENT_ENDPOINT, json=payload)
-    assert response.status_code == 422
+EVENT_POST_CASES = [
+    pytest.param(
+        {"name": "Test Event", "date": "2025-09-03", "start_time": "19:00", "end_time": "21:00", "location": "Test Location"},
+        200,
+        {"name": "Test Event", "date": "2025-09-03", "start_time": "19:00", "end_time": "21:00", "location": "Test Location"},
+        id="valid_data"
+    ),
+    pytest.param(
+        _VALID_EVENT,
+        200,
+        {"start_time": "19:00", "end_time": "21:00", "name": "Youth Group", "location": None},
+        id="defaults_times_and_name"
+    ),
+    pytest.param(
+        {**_VALID_EVENT, "start_time": "18:30", "end_time": "22:00", "name": "Lock-In", "location": "Community Center"},
+        200,
+        {"start_time": "18:30", "end_time": "22:00", "name": "Lock-In", "location": "Community Center"},
+        id="custom_times_and_location"
+    ),
+    pytest.param({k: v for k, v in _VALID_EVENT.items() if k != "date"}, 422, {}, id="missing_date"),
+]
 
-def test_create_event_with_custom_times_and_location():
-    payload = valid_event_payload()
-    payload["start_time"] = "18:30"
-    payload["end_time"] = "22:00"
-    payload["name"] = "Lock-In"
-    payload["location"] = "Community Center"
+@pytest.mark.parametrize("payload,expected_status,expected", EVENT_POST_CASES)
+def test_event_post(client, payload, expected_status, expected):
     response = client.post(EVENT_ENDPOINT, json=payload)
-    assert response.status_code in (200, 201)
+    assert response.status_code == expected_status
+    
     data = response.json()
-    assert data["start_time"] == "18:30"
-    assert data["end_time"] == "22:00"
-    assert data["name"] == "Lock-In"
-    assert data["location"] == "Community Center"
+    for field, value in expected.items():
+        assert data.get(field) == value
+    if expected_status == 200:
+        # Should have auto-generated datetime fields
+        assert "start_datetime" in data
+        assert "end_datetime" in data
 
-def test_get_event():
-    payload = valid_event_payload()
-    response = client.post(EVENT_ENDPOINT, json=payload)
+def test_get_event(client):
+    response = client.post(EVENT_ENDPOINT, content=VALID_EVENT_BYTES, headers=JSON_HEADERS)
     assert response.status_code in (200, 201)
     created_event = response.json()
     event_id = created_event["id"]  # Get the auto-generated ID
@@ -220,40 +177,29 @@ def test_get_event():
     data = response.json()
     assert data["id"] == event_id
     assert data["date"] == "2025-09-01"
-    data = response.json()
-    assert data["id"] == event_id
     assert data["name"] == "Youth Group"
     assert data["start_time"] == "19:00"
     assert data["end_time"] == "21:00"
     assert "location" not in data or data["location"] is None
 
 def test_eventperson_missing_checkin_raises_validation_error():
-    from app.models import EventPerson
-    import pytest
-    with pytest.raises(Exception) as excinfo:
+    # Message renders as: "1 validation error for EventPerson\ncheck_in\n  Field required [type=missing, ..."
+    with pytest.raises(ValidationError, match=r"(?s)validation error for EventPerson.*check_in.*type=missing"):
         EventPerson(person_id=1)
 
-    assert "EventPerson" in str(excinfo.value)
-    assert "validation error" in str(excinfo.value)
-    assert "type=missing" in str(excinfo.value)
-    assert "check_in" in str(excinfo.value)
-
-def test_get_nonexistent_event_returns_404():
+def test_get_nonexistent_event_returns_404(client):
     response = client.get(f"{EVENT_ENDPOINT}/9999")
     assert response.status_code == 404
 
-def test_get_events_empty_list():
+def test_get_events_empty_list(client):
     response = client.get(f"{EVENT_ENDPOINT}s")
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list)
     assert len(data) == 0
 
-def test_get_events_nonempty_list():
-    import datetime
-    from app.config import settings
-    
-    event_date = datetime.date.today()
+def test_get_events_nonempty_list(client, today):
+    event_date = today
     payload = {
         "date": event_date.isoformat(),
         "name": "Youth Group Test Event"
@@ -272,11 +218,7 @@ def test_get_events_nonempty_list():
     assert len(data) >= 1
     assert any(e["id"] == expected_id for e in data)
 
-def test_get_events_filter_last_x_days():
-    import datetime
-    from app.config import settings
-    
-    today = datetime.date.today()
+def test_get_events_filter_last_x_days(client, today):
     old_date = today - datetime.timedelta(days=10)
     payload_recent = {
         "date": today.isoformat(),
@@ -307,9 +249,8 @@ def test_get_events_filter_last_x_days():
     assert recent_id in ids
     assert old_id not in ids  # Old event should not be in recent list
 
-def test_get_events_filter_name_contains():
-    import datetime
-    event_date = datetime.date.today()
+def test_get_events_filter_name_contains(client, today):
+    event_date = today
     payload1 = {
         "id": 30,
         "date": event_date.isoformat(),
@@ -21,55 +21,19 @@ GROUPS_ENDPOINT = "/groups"
 
 
 @pytest.fixture(autouse=True)
-def clear_stores():
+def clear_stores(clean_database):
     """Clear all stores for each test."""
     from app.repositories import get_person_repository, get_group_repository, get_user_repository
     from app.config import settings
     
     if settings.DATABASE_TYPE == "postgresql":
-        # For PostgreSQL integration tests, ensure test users exist for both possible IDs
-        from app.database import get_db
-        from app.db_models import UserDB, MessageGroupDB, MessageGroupMembershipDB
-        
-        db = next(get_db())
-        if db is not None:
-            try:
-                # Clear groups and memberships first to avoid foreign key issues
-                db.query(MessageGroupMembershipDB).delete()
-                db.query(MessageGroupDB).delete()
-                
-                # Create test users for both ID 1 and ID 999 to handle different test environments
-                test_users = [
-                    {"id": 1, "username": "test_admin_1"},
-                    {"id": 999, "username": "test_admin_999"}
-                ]
-                
-                for user_data in test_users:
-                    existing_user = db.query(UserDB).filter(UserDB.id == user_data["id"]).first()
-                    if not existing_user:
-                        test_user_db = UserDB(
-                            id=user_data["id"],
-                            username=user_data["username"],
-                            password_hash="test_hash",
-                            role="admin"
-                        )
-                        db.add(test_user_db)
-                
-                db.commit()
-            except Exception as e:
-                # If user creation fails, try to rollback
-                try:
-                    db.rollback()
-                except:
-                    pass
+        # clean_database rolls back everything the test writes, and the test
+        # users are seeded once per session by seed_test_users
+        pass
     else:
-        # For memory tests, clear the stores
-        class MockSession:
-            pass
-        
-        mock_session = MockSession()
-        person_repo = get_person_repository(mock_session)
-        group_repo = get_group_repository(mock_session)
+        # For memory tests, clear the stores (memory repositories need no session)
+        person_repo = get_person_repository()
+        group_repo = get_group_repository()
         
         if isinstance(person_repo, InMemoryPersonRepository):
             person_repo.store.clear()
@@ -32,12 +32,8 @@ def clear_person_store(clean_database):
         # Database cleaning is handled by clean_database fixture
         pass
     else:
-        # Create a mock session for memory repository
-        class MockSession:
-            pass
-        
-        mock_session = MockSession()
-        person_repo = get_person_repository(mock_session)
+        # Memory repositories ignore the session argument
+        person_repo = get_person_repository()
         from app.repositories.memory import InMemoryPersonRepository
         if isinstance(person_repo, InMemoryPersonRepository):
             person_repo.store.clear()
@@ -44,6 +44,7 @@ def setup_test_environment():
         db.add = Mock()
         db.commit = Mock()
         db.query = Mock()
+        db.get.return_value = None
         # Mock query chain for message history
         query_mock = Mock()
         query_mock.filter.return_value = query_mock
@@ -51,8 +52,11 @@ def setup_test_environment():
         query_mock.order_by.return_value = query_mock
         query_mock.offset.return_value = query_mock
         query_mock.limit.return_value = query_mock
+        query_mock.group_by.return_value = query_mock
         query_mock.all.return_value = []
         query_mock.first.return_value = None
+        query_mock.scalar.return_value = None
+        query_mock.one.return_value = (0, 0, 0, 0)
         db.query.return_value = query_mock
         return db
     
@@ -317,6 +321,65 @@ class TestSMSAPI:
         assert "total_count" in data
         assert data["total_count"] == 0  # Empty list from mock
     
+    def test_export_message_history_streams_ndjson(self, client, auth_headers):
+        """Test exporting message history returns a newline-delimited JSON stream."""
+        response = client.get("/api/sms/history/export?group_id=1", headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.text == ""  # No messages stored in in-memory mode
+
+    def test_export_message_history_streams_every_row_in_order(self, client, auth_headers):
+        """Test that the export streams one NDJSON line per row, in query order, through yield_per."""
+        import json
+        from types import SimpleNamespace
+        from app.database import get_db
+        from app.routers.sms import HISTORY_EXPORT_BATCH_SIZE
+
+        # Two and a half batches, newest first as the query orders them
+        row_count = HISTORY_EXPORT_BATCH_SIZE * 2 + HISTORY_EXPORT_BATCH_SIZE // 2
+        rows = [
+            SimpleNamespace(
+                id=row_count - i,
+                content=f"Message {row_count - i}",
+                status="delivered",
+                group_id=1,
+                recipient_phone="+12345678901",
+                recipient_person_id=1,
+                sent_by="user_1",
+                twilio_sid=f"SM{row_count - i}",
+                sent_at=None,
+                delivered_at=None,
+                created_at=datetime(2026, 3, 15, tzinfo=timezone.utc)
+            )
+            for i in range(row_count)
+        ]
+
+        query_mock = Mock()
+        query_mock.filter.return_value = query_mock
+        query_mock.order_by.return_value = query_mock
+        query_mock.yield_per.return_value = iter(rows)
+        db = Mock()
+        db.query.return_value = query_mock
+        app.dependency_overrides[get_db] = lambda: db
+
+        with patch("app.routers.sms._MEMORY_DB", False):
+            response = client.get("/api/sms/history/export?group_id=1", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.text.endswith("\n")
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == [row.id for row in rows]
+        assert lines[0]["content"] == f"Message {row_count}"
+        assert lines[0]["twilio_sid"] == f"SM{row_count}"
+
+        # Rows come through the server-side cursor in fixed-size batches, newest first
+        query_mock.yield_per.assert_called_once_with(HISTORY_EXPORT_BATCH_SIZE)
+        (order_by,), _ = query_mock.order_by.call_args
+        assert str(order_by) == "messages.created_at DESC"
+
     def test_get_message_status_success(self, client, auth_headers):
         """Test retrieving status of specific message."""
         # This will return 404 for non-existent message due to mock returning None
@@ -381,25 +381,20 @@ class TestSMSParentIntegration:
         """Test that parent SMS sends are tracked separately in analytics."""
         def get_mock_sms_service():
             service = Mock(spec=SMSService)
-            # Mock analytics response with parent breakdown
-            service.get_analytics = Mock(return_value={
-                "total_sent": 10,
-                "total_delivered": 8,
-                "total_failed": 2,
-                "delivery_rate": 80.0,
-                "total_cost": 1.50,
-                "youth_messages": 6,
-                "parent_messages": 4,
-                "parent_notification_rate": 0.67,  # 4 parent msgs / 6 youth msgs
-                "opt_out_rate": 0.1
-            })
+            service.get_total_cost.return_value = 1.50
             return service
         
+        from app.database import get_db
         from app.routers.sms import get_sms_service
         app.dependency_overrides[get_sms_service] = get_mock_sms_service
+        app.dependency_overrides[get_db] = lambda: Mock()
+        
+        # 10 messages, 6 of them to youth person records and 4 to parents
+        message_counts = {"total": 10, "delivered": 8, "failed": 2, "with_person": 6}
         
         # Act
-        response = client.get("/api/sms/analytics", headers=auth_headers)
+        with patch("app.routers.sms.sms_analytics.get_message_counts", return_value=message_counts):
+            response = client.get("/api/sms/analytics", headers=auth_headers)
         
         # Assert
         assert response.status_code == 200
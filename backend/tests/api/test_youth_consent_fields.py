@@ -26,11 +26,8 @@ def clear_store(clean_database):
     from app.repositories.memory import InMemoryPersonRepository
 
     if settings.DATABASE_TYPE != "postgresql":
-
-        class MockSession:
-            pass
-
-        repo = get_person_repository(MockSession())
+        # Memory repositories ignore the session argument
+        repo = get_person_repository()
         if isinstance(repo, InMemoryPersonRepository):
             repo.store.clear()
 
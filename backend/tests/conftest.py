@@ -3,8 +3,12 @@ Pytest configuration and shared fixtures for PostgreSQL integration tests.
 """
 import pytest
 import os
+# Loaded up front (once per xdist worker) rather than on first use mid-suite
+import datetime
+from zoneinfo import ZoneInfo
+from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.database import Base
 from app.config import settings
 
@@ -12,12 +16,16 @@ from app.config import settings
 def setup_test_database():
     """
     Session-scoped fixture to set up and clean up test database.
-    Only runs when using PostgreSQL.
+    Only runs when using PostgreSQL; yields the engine (None otherwise).
     """
     if settings.DATABASE_TYPE != "postgresql":
-        yield
+        yield None
         return
     
+    # Each pytest-xdist worker runs against its own database
+    from tests.test_config import ensure_database_exists
+    ensure_database_exists(settings.database_url)
+    
     # Create engine for test database
     engine = create_engine(settings.database_url)
     
@@ -27,29 +35,126 @@ def setup_test_database():
     # Create all tables
     Base.metadata.create_all(bind=engine)
     
-    yield
+    yield engine
     
     # Clean up after all tests
     Base.metadata.drop_all(bind=engine)
     engine.dispose()
 
+@pytest.fixture(scope="session", autouse=True)
+def _warm_app():
+    """
+    Build the OpenAPI schema (and with it every Pydantic model schema) once,
+    instead of lazily inside whichever test touches it first.
+    """
+    from app.main import app
+    app.openapi()
+    return app
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    Session-scoped test client with authentication mocked.
+    Test modules that need a differently configured client define their own.
+    
+    Used as a context manager so the app's lifespan (database engine and
+    repositories) starts once for the session and shuts down at the end.
+    """
+    from tests.test_helpers import get_authenticated_client
+    with get_authenticated_client() as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def memory_event_repo(client):
+    """
+    Session-wide in-memory event repository installed as the app's event repo.
+    None when running against PostgreSQL.
+    """
+    if settings.DATABASE_TYPE == "postgresql":
+        return None
+    
+    from app import repositories
+    from app.repositories.memory import InMemoryEventRepository
+    repositories.event_repo = InMemoryEventRepository()
+    return repositories.event_repo
+
+# Admin users the API tests authenticate as, for both test environments' user ids
+TEST_USERS = [
+    {"id": 1, "username": "test_admin_1"},
+    {"id": 999, "username": "test_admin_999"}
+]
+
+def _seed_test_users(engine):
+    """Insert TEST_USERS unless they already exist, and commit."""
+    from sqlalchemy.dialects.postgresql import insert
+    from app.db_models import UserDB
+    
+    rows = [{**user, "password_hash": "test_hash", "role": "admin"} for user in TEST_USERS]
+    with engine.begin() as conn:
+        conn.execute(insert(UserDB).values(rows).on_conflict_do_nothing())
+
+@pytest.fixture(scope="session", autouse=True)
+def seed_test_users(setup_test_database):
+    """
+    Seed the test users once per session (PostgreSQL only). They are committed
+    before any test transaction begins, so every rollback leaves them in place.
+    """
+    if setup_test_database is not None:
+        _seed_test_users(setup_test_database)
+
+# Whether rows may have been committed outside a clean_database transaction
+_database_dirty = True
+
+@pytest.fixture(autouse=True)
+def _track_committed_data(request):
+    """Tests without clean_database may commit rows that clean_database must clear."""
+    global _database_dirty
+    yield
+    if "clean_database" not in request.fixturenames:
+        _database_dirty = True
+
 @pytest.fixture(scope="function")
-def clean_database():
+def clean_database(setup_test_database):
     """
-    Function-scoped fixture to clean database between tests.
-    Only runs when using PostgreSQL.
+    Function-scoped fixture that isolates each test in a rolled-back transaction.
+    Only runs when using PostgreSQL; yields the test's session (None otherwise).
+    
+    The app's get_db dependency yields a session on one connection whose outer
+    transaction is rolled back after the test; app commits only release
+    SAVEPOINTs. Tables are truncated only when a test without this fixture
+    may have committed data since the last clean.
     """
+    global _database_dirty
+    
     if settings.DATABASE_TYPE != "postgresql":
-        yield
+        yield None
         return
     
-    # Clean before test
-    _clean_test_database()
+    if _database_dirty:
+        _clean_test_database()
+        _seed_test_users(setup_test_database)
+        _database_dirty = False
     
-    yield
+    from app.main import app
+    from app.database import get_db
+    
+    connection = setup_test_database.connect()
+    transaction = connection.begin()
+    session = Session(
+        bind=connection, autoflush=False, expire_on_commit=False, join_transaction_mode="create_savepoint"
+    )
     
-    # Clean after test
-    _clean_test_database()
+    def get_test_db():
+        yield session
+    
+    app.dependency_overrides[get_db] = get_test_db
+    try:
+        yield session
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        session.close()
+        transaction.rollback()
+        connection.close()
 
 def _clean_test_database():
     """Clean all data from test database tables."""
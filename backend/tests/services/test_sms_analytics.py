@@ -0,0 +1,62 @@
+"""
+Tests for SMS analytics rollups.
+
+Rollups are checked against the raw messages table: late status changes
+must reach days that were already rolled up, and days split at UTC midnight.
+"""
+
+from datetime import date, datetime, timedelta
+
+from app.db_models import MessageDB, SMSDailyRollupDB
+from app.messaging_models import MessageChannel, MessageStatus
+from app.services import sms_analytics
+
+
+def _add_message(db, created_at, status=MessageStatus.SENT):
+    message = MessageDB(
+        channel=MessageChannel.SMS,
+        content="Test message",
+        status=status,
+        created_at=created_at
+    )
+    db.add(message)
+    db.commit()
+    return message
+
+
+class TestSMSAnalyticsRollups:
+    """Test nightly rollups and the counts served from them."""
+
+    def test_roll_up_picks_up_late_status_changes(self, test_db):
+        """Test that a delivery callback after the day's rollup still reaches its counts."""
+        through = date(2026, 3, 15)
+        message = _add_message(test_db, datetime(2026, 3, 15, 20, 0))
+
+        sms_analytics.roll_up(test_db, through)
+        assert test_db.get(SMSDailyRollupDB, through).delivered_count == 0
+
+        # The delivered webhook lands after the nightly run
+        message.status = MessageStatus.DELIVERED
+        test_db.commit()
+
+        sms_analytics.roll_up(test_db, through + timedelta(days=1))
+
+        rollup = test_db.get(SMSDailyRollupDB, through)
+        test_db.refresh(rollup)
+        assert rollup.total_count == 1
+        assert rollup.delivered_count == 1
+
+        counts = sms_analytics.get_message_counts(test_db)
+        assert counts["total"] == 1
+        assert counts["delivered"] == 1
+
+    def test_roll_up_splits_days_at_utc_midnight(self, test_db):
+        """Test that messages either side of UTC midnight count toward their own days."""
+        _add_message(test_db, datetime(2026, 3, 14, 23, 59, 59))
+        _add_message(test_db, datetime(2026, 3, 15, 0, 0))
+
+        written = sms_analytics.roll_up(test_db, date(2026, 3, 15))
+
+        assert written == 2
+        assert test_db.get(SMSDailyRollupDB, date(2026, 3, 14)).total_count == 1
+        assert test_db.get(SMSDailyRollupDB, date(2026, 3, 15)).total_count == 1
@@ -188,6 +188,17 @@ class TestSMSService:
         # Verify Twilio API was not called
         mock_twilio_client.messages.create.assert_not_called()
 
+    def test_sms_opt_out_status_from_caller_blocks_message(self, sms_service, mock_twilio_client):
+        """Test that a caller-supplied opt-out status is honoured without a database lookup."""
+        sms_service.db = Mock()
+        
+        result = sms_service.send_message("+14165551234", "Test message", person_id=123, opted_out=True)
+        
+        assert result["success"] is False
+        assert result["status"] == "opted_out"
+        sms_service.db.query.assert_not_called()
+        mock_twilio_client.messages.create.assert_not_called()
+
     def test_sms_sends_to_non_opted_out_users(self, sms_service, mock_twilio_client, test_db):
         """Test that SMS sends successfully to users who have not opted out."""
         # Arrange - create a person who has not opted out
@@ -223,7 +234,8 @@ class TestSMSService:
         # Verify Twilio API was called
         mock_twilio_client.messages.create.assert_called_once()
 
-    def test_get_sms_recipients_excludes_opted_out(self, sms_service, test_db):
+    @pytest.mark.asyncio
+    async def test_get_sms_recipients_excludes_opted_out(self, sms_service, test_db):
         """Test that get_sms_recipients only returns users who haven't opted out."""
         # Arrange - create multiple persons with different opt-out status
         from app.db_models import PersonDB
@@ -243,7 +255,7 @@ class TestSMSService:
         sms_service_with_db = SMSService(sms_service.settings, test_db)
         
         # Act
-        recipients = sms_service_with_db.get_sms_recipients()
+        recipients = await sms_service_with_db.get_sms_recipients()
         
         # Assert
         assert len(recipients) == 2  # Only persons 1 and 3
@@ -270,7 +282,91 @@ class TestSMSService:
             sms_service.send_message("+16505551234", "Rate limit test")
         
         assert "Rate limit exceeded" in str(exc_info.value)
-    
+
+    def test_rate_limiting_holds_for_concurrent_sends(self, sms_service, mock_twilio_client):
+        """Test that sends from several threads at once can't exceed the limit."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        limit = 5
+        settings = sms_service.settings.model_copy(update={"max_messages_per_hour": limit})
+        limited_service = SMSService(settings)
+
+        # Hold every Twilio call until all threads have had a chance to check the limit
+        release = threading.Event()
+        mock_message = Mock(sid="SM123456789", status="queued")
+
+        def slow_create(**kwargs):
+            release.wait(timeout=1)
+            return mock_message
+
+        mock_twilio_client.messages.create.side_effect = slow_create
+
+        def send(i):
+            try:
+                return limited_service.send_message("+16505551234", f"Message {i}")
+            except RateLimitError:
+                return None
+
+        with ThreadPoolExecutor(max_workers=limit * 2) as pool:
+            futures = [pool.submit(send, i) for i in range(limit * 2)]
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert sum(result is not None for result in results) == limit
+        assert mock_twilio_client.messages.create.call_count == limit
+
+    def test_rate_limit_slot_released_when_send_fails(self, sms_service, mock_twilio_client):
+        """Test that a failed Twilio call doesn't use up the hourly budget."""
+        from twilio.base.exceptions import TwilioRestException
+
+        settings = sms_service.settings.model_copy(update={"max_messages_per_hour": 1})
+        limited_service = SMSService(settings)
+
+        mock_twilio_client.messages.create.side_effect = TwilioRestException(status=500, uri="test_uri", msg="Down")
+        with pytest.raises(SMSError):
+            limited_service.send_message("+16505551234", "Fails")
+
+        mock_twilio_client.messages.create.side_effect = None
+        mock_twilio_client.messages.create.return_value = Mock(sid="SM123456789", status="queued")
+        result = limited_service.send_message("+16505551234", "Goes out")
+
+        assert result["success"] is True
+        with pytest.raises(RateLimitError):
+            limited_service.send_message("+16505551234", "Over the limit")
+
+    def test_rate_limiting_shared_through_redis(self, sms_service, mock_twilio_client):
+        """Test that a Redis-backed service reserves sends in the shared count across workers."""
+        # Arrange - another worker has already used the whole hourly budget
+        mock_redis = Mock()
+        reserve_script = Mock(return_value=0)
+        mock_redis.register_script.return_value = reserve_script
+
+        shared_service = SMSService(sms_service.settings, redis_client=mock_redis)
+
+        # Act & Assert
+        with pytest.raises(RateLimitError):
+            shared_service.send_message("+16505551234", "Rate limit test")
+
+        mock_twilio_client.messages.create.assert_not_called()
+
+        # Under the limit the script records the send and it goes out
+        reserve_script.return_value = 1
+        mock_twilio_client.messages.create.return_value = Mock(sid="SM123456789", status="queued")
+        shared_service.send_message("+16505551234", "Shared limit test")
+
+        mock_twilio_client.messages.create.assert_called_once()
+        mock_redis.zrem.assert_not_called()
+
+        # A failed send gives its reservation back
+        from twilio.base.exceptions import TwilioRestException
+        mock_twilio_client.messages.create.side_effect = TwilioRestException(status=500, uri="test_uri", msg="Down")
+        with pytest.raises(SMSError):
+            shared_service.send_message("+16505551234", "Fails")
+
+        member = reserve_script.call_args.kwargs["args"][2]
+        mock_redis.zrem.assert_called_once_with("sms:sent", member)
+
     def test_cost_tracking(self, sms_service, mock_twilio_client):
         """Test SMS cost tracking."""
         # Arrange
@@ -419,6 +515,89 @@ class TestSMSWebhook:
         ).first()
         assert updated_message.status == MessageStatus.DELIVERED
         assert updated_message.delivered_at is not None
+    
+    @pytest.fixture
+    def sent_message(self, test_db):
+        """A sent SMS record, with the user and group it belongs to, for webhook tests."""
+        from app.db_models import MessageDB, MessageGroupDB, UserDB
+        from app.messaging_models import MessageChannel, MessageStatus
+        
+        user = UserDB(username="webhook_user", password_hash="hashed_password")
+        test_db.add(user)
+        test_db.flush()
+        
+        group = MessageGroupDB(name="Webhook Group", created_by=user.id)
+        test_db.add(group)
+        test_db.flush()
+        
+        message = MessageDB(
+            group_id=group.id,
+            sent_by=user.id,
+            channel=MessageChannel.SMS,
+            content="Test message",
+            status=MessageStatus.SENT,
+            twilio_sid="SM987654321"
+        )
+        test_db.add(message)
+        test_db.commit()
+        return message
+    
+    @pytest.mark.parametrize("twilio_status", ["queued", "sending", "sent"])
+    def test_webhook_intermediate_status_leaves_message_unchanged(self, sms_service, test_db, sent_message, twilio_status):
+        """Test that queued/sending/sent callbacks don't touch the stored message."""
+        from app.db_models import MessageDB
+        from app.messaging_models import MessageStatus
+        
+        sms_service_with_db = SMSService(sms_service.settings, test_db)
+        sms_service_with_db.validator.validate = Mock(return_value=True)
+        
+        webhook_data = {"MessageSid": sent_message.twilio_sid, "MessageStatus": twilio_status}
+        
+        # Act
+        result = sms_service_with_db.handle_webhook(webhook_data, "https://example.com/webhook", "valid_signature")
+        
+        # Assert
+        assert result["valid"] is True
+        assert result["status"] == twilio_status
+        assert result["updated"] is False
+        
+        stored = test_db.get(MessageDB, sent_message.id)
+        test_db.refresh(stored)
+        assert stored.status == MessageStatus.SENT
+        assert stored.delivered_at is None
+        assert stored.failed_at is None
+        assert stored.failure_reason is None
+    
+    @pytest.mark.parametrize("twilio_status", ["failed", "undelivered"])
+    def test_webhook_failed_status_records_failure(self, sms_service, test_db, sent_message, twilio_status):
+        """Test that a failed callback stores failed_at and the Twilio error code."""
+        from app.db_models import MessageDB
+        from app.messaging_models import MessageStatus
+        
+        sms_service_with_db = SMSService(sms_service.settings, test_db)
+        sms_service_with_db.validator.validate = Mock(return_value=True)
+        
+        webhook_data = {
+            "MessageSid": sent_message.twilio_sid,
+            "MessageStatus": twilio_status,
+            "ErrorCode": "30003"
+        }
+        
+        # Act
+        result = sms_service_with_db.handle_webhook(webhook_data, "https://example.com/webhook", "valid_signature")
+        
+        # Assert
+        assert result["valid"] is True
+        assert result["updated"] is True
+        
+        stored = test_db.get(MessageDB, sent_message.id)
+        test_db.refresh(stored)
+        assert stored.status == MessageStatus.FAILED
+        assert stored.failed_at is not None
+        assert stored.delivered_at is None
+        assert stored.failure_reason == "Twilio error code 30003"
+
+
 class TestSMSServiceConfiguration:
     """Test SMS service configuration and settings."""
     
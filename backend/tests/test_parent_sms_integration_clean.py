@@ -210,7 +210,7 @@ class TestParentsInSMSGroups:
         def get_mock_sms_service():
             mock_service = Mock()
             # Mock the get_sms_recipients method which should filter out opted-out users
-            mock_service.get_sms_recipients = Mock(return_value=[
+            mock_service.get_sms_recipients = AsyncMock(return_value=[
                 {
                     "id": parent_id,
                     "first_name": "David",
@@ -292,7 +292,7 @@ class TestParentsInSMSGroups:
         def get_mock_sms_service():
             mock_service = Mock(spec=SMSService)
             # Opted-out parent should not be in recipients
-            mock_service.get_sms_recipients = Mock(return_value=[])
+            mock_service.get_sms_recipients = AsyncMock(return_value=[])
             mock_service.send_message = Mock()
             return mock_service
         
@@ -379,7 +379,7 @@ class TestParentSMSBackendIntegration:
         
         def get_mock_sms_service():
             mock_service = Mock(spec=SMSService)
-            mock_service.get_sms_recipients = Mock(return_value=[
+            mock_service.get_sms_recipients = AsyncMock(return_value=[
                 {
                     "id": parent_id,
                     "first_name": "Lisa",